@@ -168,6 +168,11 @@ class AutoCodeAnalyzer:
         self.task_queue = PriorityQueue()
         self.tasks = {}  # task_id -> task
         
+        # Подписчики на завершение задач: callback(task_id, task_info)
+        self._completion_callbacks = []
+        # Подписчики на смену статуса: callback(task_id, old_status, new_status)
+        self._status_callbacks = []
+        
         # Запуск фонового обработчика задач
         self.stop_event = threading.Event()
         self.worker_thread = threading.Thread(target=self._task_worker)
@@ -195,6 +200,7 @@ class AutoCodeAnalyzer:
         
         # Сохранение задачи
         self.tasks[task_id] = task
+        self._set_status(task, "pending", is_new=True)
         self._save_task(task)
         
         # Добавление в очередь
@@ -249,6 +255,48 @@ class AutoCodeAnalyzer:
         
         return tasks
     
+    def register_completion_callback(self, callback) -> None:
+        """
+        Подписка на завершение задач (статусы completed и failed)
+        
+        Args:
+            callback: Функция callback(task_id, task_info), вызывается
+                      в потоке обработчика задач
+        """
+        self._completion_callbacks.append(callback)
+    
+    def register_status_callback(self, callback) -> None:
+        """
+        Подписка на смену статуса задач
+        
+        Args:
+            callback: Функция callback(task_id, old_status, new_status);
+                      для новой задачи old_status равен None
+        """
+        self._status_callbacks.append(callback)
+    
+    def _set_status(self, task: AutoAnalysisTask, status: str, is_new: bool = False) -> None:
+        """Смена статуса задачи с оповещением подписчиков"""
+        old_status = None if is_new else task.status
+        task.status = status
+        for callback in self._status_callbacks:
+            try:
+                callback(task.task_id, old_status, status)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике статуса задачи {task.task_id}: {str(e)}")
+    
+    def _notify_completed(self, task: AutoAnalysisTask) -> None:
+        """Оповещение подписчиков о завершении задачи"""
+        if not self._completion_callbacks:
+            return
+        
+        task_info = task.to_dict()
+        for callback in self._completion_callbacks:
+            try:
+                callback(task.task_id, task_info)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике завершения задачи {task.task_id}: {str(e)}")
+    
     def cancel_task(self, task_id: str) -> bool:
         """
         Отмена задачи
@@ -261,14 +309,14 @@ class AutoCodeAnalyzer:
         """
         task = self.tasks.get(task_id)
         if task:
-            task.status = "canceled"
+            self._set_status(task, "canceled")
             self._save_task(task)
             return True
         
         # Попытка загрузить из файла
         task = self._load_task(task_id)
         if task:
-            task.status = "canceled"
+            self._set_status(task, "canceled")
             self._save_task(task)
             return True
         
@@ -295,23 +343,24 @@ class AutoCodeAnalyzer:
                 
                 # Обработка задачи
                 try:
-                    task.status = "processing"
+                    self._set_status(task, "processing")
                     self._save_task(task)
                     
                     # Выполнение анализа
                     self._process_task(task)
                     
                     # Завершение задачи
-                    task.status = "completed"
+                    self._set_status(task, "completed")
                     self._save_task(task)
                     
                 except Exception as e:
                     logger.error(f"Ошибка при обработке задачи {task_id}: {str(e)}")
-                    task.status = "failed"
+                    self._set_status(task, "failed")
                     task.result = {"error": str(e)}
                     self._save_task(task)
                 
                 finally:
+                    self._notify_completed(task)
                     self.task_queue.task_done()
             
             except Exception as e:
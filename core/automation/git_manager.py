@@ -45,7 +45,8 @@ class GitManager:
             # Query analysis results for git metadata
             results = self.db_manager.get_file_analysis(
                 file_path=self.repo_path,
-                analysis_type="git_analysis"
+                analysis_type="git_analysis",
+                limit=1
             )
             
             if results and results[0][1].get('last_commit'):
@@ -134,37 +135,29 @@ class GitManager:
                     result=commit
                 )
             
-            # Update file statuses
+            # Update file statuses in a single batch
+            now = datetime.now().isoformat()
+            rows = []
             for file_path in changes['modified']:
                 if os.path.exists(os.path.join(self.repo_path, file_path)):
-                    self.db_manager.add_file(
-                        path=file_path,
-                        language=self._get_file_language(file_path),
-                        metadata={
-                            "last_modified": datetime.now().isoformat(),
-                            "status": "modified"
-                        }
-                    )
+                    rows.append((file_path, self._get_file_language(file_path), {
+                        "last_modified": now,
+                        "status": "modified"
+                    }))
             
             for file_path in changes['added']:
-                self.db_manager.add_file(
-                    path=file_path,
-                    language=self._get_file_language(file_path),
-                    metadata={
-                        "added_at": datetime.now().isoformat(),
-                        "status": "new"
-                    }
-                )
+                rows.append((file_path, self._get_file_language(file_path), {
+                    "added_at": now,
+                    "status": "new"
+                }))
             
             for file_path in changes['deleted']:
-                self.db_manager.add_file(
-                    path=file_path,
-                    language=self._get_file_language(file_path),
-                    metadata={
-                        "deleted_at": datetime.now().isoformat(),
-                        "status": "deleted"
-                    }
-                )
+                rows.append((file_path, self._get_file_language(file_path), {
+                    "deleted_at": now,
+                    "status": "deleted"
+                }))
+            
+            self.db_manager.add_files_bulk(rows)
                 
         except Exception as e:
             print(f"<error>Failed to process changes: {str(e)}</error>")
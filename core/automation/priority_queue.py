@@ -1,8 +1,12 @@
 import redis
+import subprocess
+import time
 from rq import Queue
-from rq.queue import get_failed_queue
+from rq.registry import FailedJobRegistry
 import logging
 import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
 from monitoring.metrics import CodebaseMetrics
 
 
@@ -10,6 +14,10 @@ metrics = CodebaseMetrics()
 
 
 class PriorityAnalysisQueue:
+    HIGH_THRESHOLD = 0.7
+    MEDIUM_THRESHOLD = 0.4
+    COMMIT_HASH_TTL = 5.0  # секунд
+
     def __init__(self):
         self.redis_conn = redis.Redis(host='localhost', port=6379, db=0)
         self.high_priority = Queue('high', connection=self.redis_conn)
@@ -17,6 +25,31 @@ class PriorityAnalysisQueue:
         self.low_priority = Queue('low', connection=self.redis_conn)
         
         self.logger = logging.getLogger(__name__)
+        self._commit_hash_cache = (None, 0.0)
+        self._language_counters = {}
+
+    def _get_commit_hash(self):
+        """Хэш HEAD, не чаще одного вызова git за COMMIT_HASH_TTL секунд"""
+        commit_hash, fetched_at = self._commit_hash_cache
+        now = time.monotonic()
+        if commit_hash is None or now - fetched_at > self.COMMIT_HASH_TTL:
+            try:
+                commit_hash = subprocess.run(
+                    ["git", "rev-parse", "HEAD"],
+                    capture_output=True, text=True, check=True
+                ).stdout.strip()
+            except (OSError, subprocess.CalledProcessError) as e:
+                self.logger.warning(f"Failed to read commit hash: {str(e)}")
+                commit_hash = None
+            self._commit_hash_cache = (commit_hash, now)
+        return commit_hash
+
+    def _files_counter(self, language):
+        """Дочерний счетчик Prometheus по языку (labels() не вызывается на каждую задачу)"""
+        counter = self._language_counters.get(language)
+        if counter is None:
+            counter = self._language_counters[language] = metrics.files_analyzed.labels(language=language)
+        return counter
 
     def _determine_priority(self, file_metadata):
         """Вычисление приоритета на основе метаданных файла"""
@@ -26,15 +59,16 @@ class PriorityAnalysisQueue:
             file_metadata.get('complexity', 0) * 0.3
         )
         
-        if priority_score > 0.7:
+        if priority_score > self.HIGH_THRESHOLD:
             return self.high_priority
-        elif priority_score > 0.4:
+        elif priority_score > self.MEDIUM_THRESHOLD:
             return self.medium_priority
         return self.low_priority
 
     def add_task(self, file_path, metadata):
         """Добавление задачи в очередь"""
         try:
+            metadata['commit_hash'] = self._get_commit_hash()
             queue = self._determine_priority(metadata)
             job = queue.enqueue(
                 'tasks.sample_task.analyze_file',
@@ -44,21 +78,50 @@ class PriorityAnalysisQueue:
             self.logger.info(f"Task added: {job.id} for {file_path}")
             
             metrics.jobs_processed.inc()
-            metrics.files_analyzed.labels(language=lang).inc()
-            
-            metadata['commit_hash'] = get_current_commit_hash()
+            self._files_counter(metadata.get('language', 'unknown')).inc()
             
             return job.id
         except redis.exceptions.RedisError as e:
             self.logger.error(f"Redis error: {str(e)}")
             raise
 
+    def add_tasks_bulk(self, items: List[Tuple[str, Dict]]) -> List[str]:
+        """Пакетное добавление задач: все задачи уходят в Redis одним pipeline"""
+        by_queue = defaultdict(list)
+        commit_hash = self._get_commit_hash()
+        for file_path, metadata in items:
+            metadata['commit_hash'] = commit_hash
+            queue = self._determine_priority(metadata)
+            by_queue[queue].append(Queue.prepare_data(
+                'tasks.sample_task.analyze_file',
+                args=(file_path, metadata),
+                meta={'file_path': file_path}
+            ))
+
+        try:
+            job_ids = []
+            with self.redis_conn.pipeline(transaction=False) as pipe:
+                for queue, job_datas in by_queue.items():
+                    jobs = queue.enqueue_many(job_datas, pipeline=pipe)
+                    job_ids.extend(job.id for job in jobs)
+                pipe.execute()
+
+            self.logger.info(f"Tasks added in bulk: {len(job_ids)}")
+            metrics.jobs_processed.inc(len(job_ids))
+            for _, metadata in items:
+                self._files_counter(metadata.get('language', 'unknown')).inc()
+            return job_ids
+        except redis.exceptions.RedisError as e:
+            self.logger.error(f"Redis error: {str(e)}")
+            raise
+
     def restart_failed_jobs(self):
         """Перезапуск упавших задач"""
-        failed_queue = get_failed_queue(self.redis_conn)
-        for job in failed_queue.get_jobs():
-            failed_queue.requeue(job.id)
-            self.logger.warning(f"Restarted failed job: {job.id}")
+        for queue in (self.high_priority, self.medium_priority, self.low_priority):
+            registry = FailedJobRegistry(queue=queue)
+            for job_id in registry.get_job_ids():
+                registry.requeue(job_id)
+                self.logger.warning(f"Restarted failed job: {job_id}")
             
     def add_refactor_task(self, file_path):
         self.add_task(file_path, {
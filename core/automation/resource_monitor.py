@@ -1,7 +1,9 @@
 import psutil
 import threading
 import time
+from contextlib import closing
 from datetime import datetime
+from itertools import takewhile
 import logging
 
 class ResourceMonitor:
@@ -107,20 +109,24 @@ class ResourceMonitor:
     def get_metrics_history(self, time_range=None):
         """Get historical metrics from the database."""
         try:
-            results = self.db_manager.get_file_analysis(
+            if not time_range:
+                return self.db_manager.get_file_analysis(
+                    file_path='system',
+                    analysis_type='resource_metrics'
+                )
+            
+            # Rows are streamed newest first: stop reading at the first one out of range.
+            # closing() finishes the generator right away so its cursor is closed
+            # and the pooled connection is returned without waiting for GC
+            start_time = datetime.now() - time_range
+            with closing(self.db_manager.iter_file_analysis(
                 file_path='system',
                 analysis_type='resource_metrics'
-            )
-            
-            # Filter by time range if specified
-            if time_range:
-                start_time = datetime.now() - time_range
-                results = [
-                    r for r in results
-                    if datetime.fromisoformat(r[1]['timestamp']) >= start_time
-                ]
-            
-            return results
+            )) as rows:
+                return list(takewhile(
+                    lambda r: datetime.fromisoformat(r[1]['timestamp']) >= start_time,
+                    rows
+                ))
         except Exception as e:
             print(f"<error>Failed to get metrics history: {str(e)}</error>")
             raise
@@ -1,29 +1,78 @@
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
+import asyncio
 import logging
+import os
+import pygit2
 
+logger = logging.getLogger(__name__)
 
-# В core/orchestration/scheduler.py
-from apscheduler.schedulers.background import BackgroundScheduler
+# HEAD, на котором остановился предыдущий опрос, для каждого репозитория
+_last_heads = {}
+
+
+def start_vcs_polling(repo_path, interval_minutes=5, queue=None, event_loop=None):
+    """Опрос репозитория в цикле событий приложения (без отдельного планировщика-потока)
 
-def start_vcs_polling():
-    scheduler = BackgroundScheduler()
+    Нужен работающий цикл событий: либо вызов из корутины, либо явный
+    event_loop, который кто-то запускает. Без цикла опросы молча не
+    срабатывали бы, поэтому в этом случае поднимается RuntimeError.
+
+    Измененные файлы ставятся в очередь анализа queue
+    (по умолчанию - новая PriorityAnalysisQueue).
+    """
+    if event_loop is None:
+        try:
+            event_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            raise RuntimeError(
+                "start_vcs_polling needs a running event loop; "
+                "call it from a coroutine or pass event_loop"
+            ) from None
+    if queue is None:
+        # Ленивый импорт: rq нужен только при реальном опросе
+        from core.automation.priority_queue import PriorityAnalysisQueue
+        queue = PriorityAnalysisQueue()
+    scheduler = AsyncIOScheduler(event_loop=event_loop)
     scheduler.add_job(
         check_repository_changes,
         'interval',
-        minutes=5,
-        args=[config['repo_path']]
+        minutes=interval_minutes,
+        args=[repo_path, queue]
     )
     scheduler.start()
+    return scheduler
+
 
-def check_repository_changes(repo_path):
-    manager = GitManager(repo_path)
-    changes = manager.get_changed_files()
+def get_changed_files(repo_path):
+    """Файлы, измененные между прошлым и текущим HEAD (через libgit2, без запуска git)"""
+    repo = pygit2.Repository(repo_path)
+    head = repo.head.target
+    last_head = _last_heads.get(repo_path)
+    _last_heads[repo_path] = head
+
+    if last_head is None or head == last_head:
+        return []
+
+    diff = repo.diff(last_head, head)
+    # Удаленные файлы анализировать уже нечего
+    return [
+        delta.new_file.path for delta in diff.deltas
+        if delta.status != pygit2.GIT_DELTA_DELETED
+    ]
+
+
+def check_repository_changes(repo_path, queue):
+    changes = get_changed_files(repo_path)
     if changes:
         logger.info(f"Found {len(changes)} new changes")
-        process_changes(changes)
-        
+        # Пути из diff относительны корня репозитория
+        queue.add_tasks_bulk([
+            (os.path.join(repo_path, file_path), {}) for file_path in changes
+        ])
+
 
 class AnalysisScheduler:
     def __init__(self, db_manager, csharp_analyzer=None, java_analyzer=None):
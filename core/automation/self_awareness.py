@@ -2,12 +2,13 @@ import os
 import subprocess
 from pathlib import Path
 from typing import List, Dict
-from git.repo import Repo
+import pygit2
 
 class SelfKnowledge:
     def __init__(self):
         self.root = Path(__file__).parent.parent
         self.mirror_dir = self.root / ".self/code"
+        self._version = None
         self._init_vfs()
         
     def _init_vfs(self):
@@ -16,7 +17,7 @@ class SelfKnowledge:
         
         # Создаем зеркало кода
         if not (self.mirror_dir / ".git").exists():
-            Repo.init(self.mirror_dir)
+            pygit2.init_repository(str(self.mirror_dir))
             
         self._sync_code_mirror()
 
@@ -32,9 +33,25 @@ class SelfKnowledge:
                 str(self.mirror_dir)
             ], check=True)
             
-            repo = Repo(self.mirror_dir)
-            repo.git.add(A=True)
-            repo.index.commit("Auto-commit bot self-knowledge")
+            # Индекс и коммит пишутся через libgit2 без вызова git-процессов
+            repo = pygit2.Repository(str(self.mirror_dir))
+            repo.index.add_all()
+            repo.index.write()
+            tree_oid = repo.index.write_tree()
+
+            parents = [] if repo.head_is_unborn else [repo.head.target]
+            if parents and repo[parents[0]].tree_id == tree_oid:
+                return  # Изменений нет
+
+            signature = pygit2.Signature("CodeAssistant", "bot@localhost")
+            repo.create_commit(
+                "HEAD",
+                signature,
+                signature,
+                "Auto-commit bot self-knowledge",
+                tree_oid,
+                parents
+            )
         except Exception as e:
             print(f"Self-sync error: {str(e)}")
 
@@ -64,10 +81,16 @@ class SelfKnowledge:
         return full_path.read_text()
 
     def _get_version(self) -> str:
-        """Получение версии из setup.py"""
+        """Получение версии из setup.py (кэшируется после первого чтения)"""
+        if self._version is None:
+            self._version = self._read_version()
+        return self._version
+
+    def _read_version(self) -> str:
         setup_path = self.mirror_dir / "setup.py"
         with open(setup_path) as f:
             for line in f:
-                if "version=" in line:
-                    return line.split("=")[1].strip(" ,'\")")
-        return "unknown"
\ No newline at end of file
+                line = line.strip()
+                if line.startswith("version="):
+                    return line.split("=", 1)[1].strip(" ,'\"")
+        return "unknown"
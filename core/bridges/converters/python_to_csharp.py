@@ -1,22 +1,83 @@
-from tree_sitter import Parser, Language
+from typing import Dict, Hashable, List, Optional, Tuple
+from tree_sitter import Parser, Language, Tree
+
+# (start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point)
+Edit = Tuple[int, int, int, Tuple[int, int], Tuple[int, int], Tuple[int, int]]
+
+# Вызовы функций, которые заменяются целиком по имени
+CALL_QUERY = '(call function: (identifier) @fn)'
+CALL_REPLACEMENTS = {
+    b"print": b"Console.WriteLine",
+}
 
 class PythonToCSharpConverter:
     def __init__(self):
         self.parser = Parser()
-        self.parser.set_language(
-            Language.build("build/python.so", "python")
-        )
-        
-    def convert(self, python_code: str) -> str:
-        """Основная логика конвертации"""
-        tree = self.parser.parse(python_code.encode())
-        
-        # Пример: Конвертация print
-        csharp_code = python_code.replace("print(", "Console.WriteLine(")
-        
+        self.language = Language.build("build/python.so", "python")
+        self.parser.set_language(self.language)
+        self._call_query = self.language.query(CALL_QUERY)
+        self._tree_cache: Dict[Hashable, Tree] = {}
+
+    def convert(
+        self,
+        python_code: str,
+        buffer_id: Optional[Hashable] = None,
+        edits: Optional[List[Edit]] = None
+    ) -> str:
+        """Основная логика конвертации.
+
+        Если передан buffer_id, дерево разбора сохраняется, и при следующем
+        вызове с edits tree-sitter перестраивает только изменённые участки.
+        """
+        source = python_code.encode()
+        tree = self._parse(source, buffer_id, edits)
+
+        # Пример: Конвертация print (только реальные вызовы, не строки и комментарии)
+        csharp_code = self._rewrite_calls(source, tree).decode()
+
         # Дополнительные правила конвертации
         return self._add_csharp_boilerplate(csharp_code)
-    
+
+    def invalidate(self, buffer_id: Optional[Hashable] = None):
+        """Сброс сохранённых деревьев (например, после смены грамматики)"""
+        if buffer_id is None:
+            self._tree_cache.clear()
+        else:
+            self._tree_cache.pop(buffer_id, None)
+
+    def _parse(
+        self,
+        source: bytes,
+        buffer_id: Optional[Hashable],
+        edits: Optional[List[Edit]]
+    ) -> Tree:
+        old_tree = None
+        if buffer_id is not None and edits:
+            old_tree = self._tree_cache.get(buffer_id)
+            if old_tree is not None:
+                for edit in edits:
+                    old_tree.edit(*edit)
+
+        tree = self.parser.parse(source, old_tree) if old_tree else self.parser.parse(source)
+
+        if buffer_id is not None:
+            self._tree_cache[buffer_id] = tree
+        return tree
+
+    def _rewrite_calls(self, source: bytes, tree: Tree) -> bytes:
+        """Замена имён вызовов по байтовым диапазонам из запроса tree-sitter"""
+        replacements = []
+        for node, _ in self._call_query.captures(tree.root_node):
+            name = source[node.start_byte:node.end_byte]
+            if name in CALL_REPLACEMENTS:
+                replacements.append((node.start_byte, node.end_byte, CALL_REPLACEMENTS[name]))
+
+        # Правки применяются с конца, чтобы смещения начала оставались верными
+        result = bytearray(source)
+        for start, end, replacement in sorted(replacements, reverse=True):
+            result[start:end] = replacement
+        return bytes(result)
+
     def _add_csharp_boilerplate(self, code: str) -> str:
         return f"""
 using System;
@@ -26,4 +87,4 @@ class Program {{
         {code}
     }}
 }}
-""".strip()
\ No newline at end of file
+""".strip()
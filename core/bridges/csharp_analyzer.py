@@ -1,7 +1,8 @@
 import clr
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
 
 class CSharpAnalyzer:
@@ -25,12 +26,16 @@ class CSharpAnalyzer:
                 clr.AddReference(str(roslyn_path / asm))
             
             from Microsoft.CodeAnalysis.CSharp import (
+                CSharpParseOptions,
                 CSharpSyntaxTree, 
                 LanguageVersion
             )
+            from Microsoft.CodeAnalysis.Text import SourceText
             
             self.syntax_tree = CSharpSyntaxTree
             self.language_version = LanguageVersion
+            self.source_text = SourceText
+            self.parse_options = CSharpParseOptions(LanguageVersion.Latest)
             self._initialized = True
             self.logger.info("C# analyzer initialized successfully")
             
@@ -50,20 +55,44 @@ class CSharpAnalyzer:
             raise FileNotFoundError(f"C# file not found: {file_path}")
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                source = f.read()
-
-            tree = self.syntax_tree.ParseText(
-                source,
-                self.language_version.Latest
-            ).GetRoot()
-
-            return self._collect_metrics(tree)
+            return self._collect_metrics(self._parse_file(file_path))
             
         except Exception as e:
             self.logger.error(f"Analysis failed for {file_path}: {str(e)}")
             raise
 
+    def analyze_files(self, file_paths: List[Path], max_workers: int = None) -> List[Dict[str, Any]]:
+        """Пакетный анализ: файлы разбираются Roslyn параллельно, метрики собираются по порядку"""
+        if not self._initialized:
+            raise RuntimeError("Analyzer not initialized")
+
+        for file_path in file_paths:
+            if not file_path.exists():
+                raise FileNotFoundError(f"C# file not found: {file_path}")
+
+        # pythonnet отпускает GIL на время вызовов CLR, поэтому ParseText
+        # из нескольких потоков действительно выполняется параллельно
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            roots = list(pool.map(self._parse_file, file_paths))
+
+        return [self._collect_metrics(root) for root in roots]
+
+    def _parse_file(self, file_path: Path):
+        """Roslyn читает файл сам из потока, без промежуточной строки Python"""
+        from System.IO import File
+        from System.Text import Encoding
+
+        stream = File.OpenRead(str(file_path))
+        try:
+            source = self.source_text.From(stream, Encoding.UTF8)
+        finally:
+            stream.Close()
+
+        return self.syntax_tree.ParseText(
+            source,
+            self.parse_options
+        ).GetRoot()
+
     def _collect_metrics(self, tree):
         """Collect various code metrics from the syntax tree."""
         try:
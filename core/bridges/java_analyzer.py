@@ -1,9 +1,17 @@
+import glob
+import threading
 import jpype
 import jpype.imports
 from pathlib import Path
 from typing import Dict, Any
 import logging
 
+# Флаги ускоряют холодный старт JVM (CDS-архив классов + G1)
+JVM_ARGS = ["-Xshare:auto", "-XX:+UseG1GC", "-XX:+TieredCompilation"]
+
+# Запуск JVM возможен один раз за процесс, параллельные конструкторы ждут здесь
+_jvm_lock = threading.Lock()
+
 
 class JavaAnalyzer:
     def __init__(self, javaparser_path: Path = None):
@@ -17,11 +25,16 @@ class JavaAnalyzer:
             if not javaparser_path:
                 javaparser_path = Path(__file__).parent / "lib" / "javaparser"
             
-            if not jpype.isJVMStarted():
-                jpype.startJVM(
-                    classpath=[str(javaparser_path / "*.jar")],
-                    convertStrings=True
-                )
+            with _jvm_lock:
+                if not jpype.isJVMStarted():
+                    jars = glob.glob(str(javaparser_path / "*.jar"))
+                    if not jars:
+                        raise FileNotFoundError(f"No JARs in {javaparser_path}")
+                    jpype.startJVM(
+                        *JVM_ARGS,
+                        classpath=jars,
+                        convertStrings=True
+                    )
             
             from com.github.javaparser import StaticJavaParser
             self.parser = StaticJavaParser
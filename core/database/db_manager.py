@@ -1,10 +1,135 @@
 import psycopg2
-from psycopg2.extras import Json
+import psycopg2.extensions
+from psycopg2.extras import Json, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from cachetools import TTLCache
+from contextlib import contextmanager
 from datetime import datetime
 import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Пулы соединений общие для всех DatabaseManager с одинаковыми параметрами
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Горячие запросы: PREPARE выполняется один раз на каждое соединение пула,
+# дальше вызовы идут через EXECUTE без повторного разбора и планирования
+PREPARED_STATEMENTS = {
+    "add_file_stmt": ("text, text, timestamp, jsonb", """
+        INSERT INTO files (path, language, last_analyzed, metadata)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (path) DO UPDATE
+        SET language = EXCLUDED.language,
+            last_analyzed = EXCLUDED.last_analyzed,
+            metadata = EXCLUDED.metadata
+        RETURNING id
+    """),
+    "add_dependency_stmt": ("text, text, text, jsonb", """
+        INSERT INTO dependencies (source_file_id, target_file_id, dep_type, metadata)
+        SELECT s.id, t.id, $3, $4
+        FROM files s, files t
+        WHERE s.path = $1 AND t.path = $2
+        ON CONFLICT (source_file_id, target_file_id, dep_type) DO UPDATE
+        SET metadata = EXCLUDED.metadata
+    """),
+    "store_analysis_stmt": ("text, text, jsonb", """
+        INSERT INTO analysis_results (file_id, analysis_type, result)
+        SELECT id, $2, $3
+        FROM files
+        WHERE path = $1
+    """),
+    # LIMIT NULL в PostgreSQL означает "без ограничения"
+    "file_analysis_stmt": ("text, bigint", """
+        SELECT ar.analysis_type, ar.result, ar.timestamp
+        FROM analysis_results ar
+        JOIN files f ON ar.file_id = f.id
+        WHERE f.path = $1
+        ORDER BY ar.timestamp DESC
+        LIMIT $2
+    """),
+    "file_analysis_by_type_stmt": ("text, text, bigint", """
+        SELECT ar.analysis_type, ar.result, ar.timestamp
+        FROM analysis_results ar
+        JOIN files f ON ar.file_id = f.id
+        WHERE f.path = $1 AND ar.analysis_type = $2
+        ORDER BY ar.timestamp DESC
+        LIMIT $3
+    """),
+    "dependencies_stmt": ("text", """
+        SELECT f2.path, d.dep_type, d.metadata
+        FROM dependencies d
+        JOIN files f1 ON d.source_file_id = f1.id
+        JOIN files f2 ON d.target_file_id = f2.id
+        WHERE f1.path = $1
+    """),
+    "dependencies_by_type_stmt": ("text, text", """
+        SELECT f2.path, d.dep_type, d.metadata
+        FROM dependencies d
+        JOIN files f1 ON d.source_file_id = f1.id
+        JOIN files f2 ON d.target_file_id = f2.id
+        WHERE f1.path = $1 AND d.dep_type = $2
+    """),
+}
+
+# CONCURRENTLY не блокирует запись в таблицы, но требует выполнения вне транзакции
+INDEX_STATEMENTS = [
+    # jsonb_path_ops: меньше и быстрее стандартного jsonb_ops для запросов @>
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS files_metadata_gin "
+    "ON files USING gin (metadata jsonb_path_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS analysis_results_result_gin "
+    "ON analysis_results USING gin (result jsonb_path_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS dependencies_metadata_gin "
+    "ON dependencies USING gin (metadata jsonb_path_ops)",
+    # Точный порядок доступа get_file_analysis / iter_file_analysis
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS analysis_results_file_type_ts_idx "
+    "ON analysis_results (file_id, analysis_type, timestamp DESC)",
+]
+
+
+class _PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether PREPARED_STATEMENTS were created on it."""
+    prepared = False
+
+
+def _get_pool(conn_params, minconn, maxconn):
+    """Lazily create the connection pool for a set of connection parameters."""
+    key = tuple(sorted(conn_params.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = ThreadedConnectionPool(
+                minconn, maxconn,
+                connection_factory=_PreparedConnection,
+                **conn_params
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    """Close every pooled connection (e.g. on shutdown or after fork)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            if not pool.closed:
+                pool.closeall()
+        _pools.clear()
+
 
 class DatabaseManager:
-    def __init__(self, dbname="code_analysis", user="postgres", password="postgres", host="localhost", port="5432"):
+    # Пул должен покрывать все рабочие потоки (3 очереди rq + планировщик и монитор)
+    POOL_MIN = 2
+    POOL_MAX = 20
+    # Результаты чтения пишутся редко, а читаются часто: держим их в памяти
+    READ_CACHE_SIZE = 4096
+    READ_CACHE_TTL = 60
+
+    def __init__(self, dbname="code_analysis", user="postgres", password="postgres", host="localhost", port="5432",
+                 pool_min=POOL_MIN, pool_max=POOL_MAX):
+        self.pool_min = pool_min
+        self.pool_max = pool_max
         self.conn_params = {
             "dbname": dbname,
             "user": user,
@@ -12,149 +137,283 @@ class DatabaseManager:
             "host": host,
             "port": port
         }
+        # path -> {analysis_type/dep_type: rows}; сброс по path при записи
+        self._analysis_cache = TTLCache(maxsize=self.READ_CACHE_SIZE, ttl=self.READ_CACHE_TTL)
+        self._dependency_cache = TTLCache(maxsize=self.READ_CACHE_SIZE, ttl=self.READ_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+        # (id(cache), path) -> счетчик записей: чтение, начатое до записи,
+        # не кладет в кэш устаревшие строки
+        self._cache_generations = {}
         self._init_db()
 
+    def _cache_get(self, cache, path, key):
+        """Cached rows as a new list: callers may mutate it without touching the cache."""
+        with self._cache_lock:
+            rows = cache.get(path, {}).get(key)
+        return None if rows is None else list(rows)
+
+    def _cache_generation(self, cache, path):
+        with self._cache_lock:
+            return self._cache_generations.get((id(cache), path), 0)
+
+    def _cache_put(self, cache, path, key, rows, generation):
+        """Cache rows read at `generation`; skipped if the path was written since."""
+        with self._cache_lock:
+            if self._cache_generations.get((id(cache), path), 0) != generation:
+                return
+            entry = cache.get(path)
+            if entry is None:
+                entry = cache[path] = {}
+            entry[key] = tuple(rows)
+
+    def _cache_invalidate(self, cache, paths):
+        with self._cache_lock:
+            for path in paths:
+                cache.pop(path, None)
+                gen_key = (id(cache), path)
+                self._cache_generations[gen_key] = self._cache_generations.get(gen_key, 0) + 1
+
+    @contextmanager
+    def _conn(self):
+        """Borrow a pooled connection; commit on success, rollback on error."""
+        conn = self.pool.getconn()
+        try:
+            if not conn.prepared:
+                self._prepare(conn)
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def _prepare(self, conn):
+        """Create the server-side prepared statements for this session."""
+        with conn.cursor() as cur:
+            for name, (arg_types, query) in PREPARED_STATEMENTS.items():
+                cur.execute(f"PREPARE {name} ({arg_types}) AS {query}")
+        conn.commit()
+        conn.prepared = True
+
     def _init_db(self):
         """Initialize database and create necessary tables if they don't exist."""
         try:
-            conn = psycopg2.connect(**self.conn_params)
-            cur = conn.cursor()
-            
-            # Create tables
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS files (
-                    id SERIAL PRIMARY KEY,
-                    path TEXT UNIQUE NOT NULL,
-                    language TEXT NOT NULL,
-                    last_analyzed TIMESTAMP,
-                    metadata JSONB
-                );
-                
-                CREATE TABLE IF NOT EXISTS dependencies (
-                    id SERIAL PRIMARY KEY,
-                    source_file_id INTEGER REFERENCES files(id),
-                    target_file_id INTEGER REFERENCES files(id),
-                    dep_type TEXT NOT NULL,
-                    metadata JSONB,
-                    UNIQUE(source_file_id, target_file_id, dep_type)
-                );
-                
-                CREATE TABLE IF NOT EXISTS analysis_results (
-                    id SERIAL PRIMARY KEY,
-                    file_id INTEGER REFERENCES files(id),
-                    analysis_type TEXT NOT NULL,
-                    result JSONB,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            conn.commit()
+            self.pool = _get_pool(self.conn_params, self.pool_min, self.pool_max)
+            # Таблицы создаются до PREPARE, поэтому здесь соединение берется напрямую
+            conn = self.pool.getconn()
+            try:
+                with conn.cursor() as cur:
+                    # Create tables
+                    cur.execute("""
+                        CREATE TABLE IF NOT EXISTS files (
+                            id SERIAL PRIMARY KEY,
+                            path TEXT UNIQUE NOT NULL,
+                            language TEXT NOT NULL,
+                            last_analyzed TIMESTAMP,
+                            metadata JSONB
+                        );
+
+                        CREATE TABLE IF NOT EXISTS dependencies (
+                            id SERIAL PRIMARY KEY,
+                            source_file_id INTEGER REFERENCES files(id),
+                            target_file_id INTEGER REFERENCES files(id),
+                            dep_type TEXT NOT NULL,
+                            metadata JSONB,
+                            UNIQUE(source_file_id, target_file_id, dep_type)
+                        );
+
+                        CREATE TABLE IF NOT EXISTS analysis_results (
+                            id SERIAL PRIMARY KEY,
+                            file_id INTEGER REFERENCES files(id),
+                            analysis_type TEXT NOT NULL,
+                            result JSONB,
+                            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        );
+                    """)
+                conn.commit()
+
+                conn.autocommit = True
+                try:
+                    with conn.cursor() as cur:
+                        for statement in INDEX_STATEMENTS:
+                            cur.execute(statement)
+                finally:
+                    conn.autocommit = False
+            finally:
+                self.pool.putconn(conn)
         except Exception as e:
-            print(f"<error>Database initialization failed: {str(e)}</error>")
+            logger.error("Database initialization failed: %s", e)
             raise
-        finally:
-            if 'cur' in locals():
-                cur.close()
-            if 'conn' in locals():
-                conn.close()
 
     def add_file(self, path, language, metadata=None):
         """Add or update a file in the database."""
         try:
-            with psycopg2.connect(**self.conn_params) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("""
+                    cur.execute(
+                        "EXECUTE add_file_stmt (%s, %s, %s, %s)",
+                        (path, language, datetime.now(), Json(metadata or {}))
+                    )
+                    return cur.fetchone()[0]
+        except Exception as e:
+            logger.error("Failed to add file: %s", e)
+            raise
+
+    def add_files_bulk(self, rows, page_size=1000):
+        """Add or update many files in one round trip per page.
+
+        rows: iterable of (path, language, metadata). Later rows win on duplicate paths.
+        """
+        now = datetime.now()
+        records = {
+            path: (path, language, now, Json(metadata or {}))
+            for path, language, metadata in rows
+        }
+        if not records:
+            return
+        try:
+            with self._conn() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
                         INSERT INTO files (path, language, last_analyzed, metadata)
-                        VALUES (%s, %s, %s, %s)
+                        VALUES %s
                         ON CONFLICT (path) DO UPDATE
                         SET language = EXCLUDED.language,
                             last_analyzed = EXCLUDED.last_analyzed,
                             metadata = EXCLUDED.metadata
-                        RETURNING id
-                    """, (path, language, datetime.now(), Json(metadata or {})))
-                    return cur.fetchone()[0]
+                    """, list(records.values()), page_size=page_size)
         except Exception as e:
-            print(f"<error>Failed to add file: {str(e)}</error>")
+            logger.error("Failed to add files in bulk: %s", e)
             raise
 
     def add_dependency(self, source_path, target_path, dep_type, metadata=None):
         """Add a dependency between two files."""
         try:
-            with psycopg2.connect(**self.conn_params) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("""
-                        WITH source AS (
-                            SELECT id FROM files WHERE path = %s
-                        ), target AS (
-                            SELECT id FROM files WHERE path = %s
-                        )
+                    cur.execute(
+                        "EXECUTE add_dependency_stmt (%s, %s, %s, %s)",
+                        (source_path, target_path, dep_type, Json(metadata or {}))
+                    )
+            self._cache_invalidate(self._dependency_cache, [source_path])
+        except Exception as e:
+            logger.error("Failed to add dependency: %s", e)
+            raise
+
+    def add_dependencies_bulk(self, rows, page_size=1000):
+        """Add many dependencies in one round trip per page.
+
+        rows: iterable of (source_path, target_path, dep_type, metadata).
+        """
+        records = {
+            (source, target, dep_type): (source, target, dep_type, Json(metadata or {}))
+            for source, target, dep_type, metadata in rows
+        }
+        if not records:
+            return
+        try:
+            with self._conn() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
                         INSERT INTO dependencies (source_file_id, target_file_id, dep_type, metadata)
-                        SELECT source.id, target.id, %s, %s
-                        FROM source, target
+                        SELECT s.id, t.id, v.dep_type, v.metadata
+                        FROM (VALUES %s) AS v(source_path, target_path, dep_type, metadata)
+                        JOIN files s ON s.path = v.source_path
+                        JOIN files t ON t.path = v.target_path
                         ON CONFLICT (source_file_id, target_file_id, dep_type) DO UPDATE
                         SET metadata = EXCLUDED.metadata
-                    """, (source_path, target_path, dep_type, Json(metadata or {})))
+                    """, list(records.values()),
+                        template="(%s, %s, %s, %s::jsonb)", page_size=page_size)
+            self._cache_invalidate(self._dependency_cache, {source for source, _, _ in records})
         except Exception as e:
-            print(f"<error>Failed to add dependency: {str(e)}</error>")
+            logger.error("Failed to add dependencies in bulk: %s", e)
             raise
 
     def store_analysis_result(self, file_path, analysis_type, result):
         """Store analysis results for a file."""
         try:
-            with psycopg2.connect(**self.conn_params) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("""
-                        WITH file_id AS (
-                            SELECT id FROM files WHERE path = %s
-                        )
-                        INSERT INTO analysis_results (file_id, analysis_type, result)
-                        SELECT id, %s, %s
-                        FROM file_id
-                    """, (file_path, analysis_type, Json(result)))
+                    cur.execute(
+                        "EXECUTE store_analysis_stmt (%s, %s, %s)",
+                        (file_path, analysis_type, Json(result))
+                    )
+            self._cache_invalidate(self._analysis_cache, [file_path])
         except Exception as e:
-            print(f"<error>Failed to store analysis result: {str(e)}</error>")
+            logger.error("Failed to store analysis result: %s", e)
             raise
 
-    def get_file_analysis(self, file_path, analysis_type=None):
-        """Retrieve analysis results for a file."""
+    def get_file_analysis(self, file_path, analysis_type=None, limit=None):
+        """Retrieve analysis results for a file, newest first (at most `limit` rows)."""
+        cache_key = (analysis_type, limit)
+        rows = self._cache_get(self._analysis_cache, file_path, cache_key)
+        if rows is not None:
+            return rows
+        generation = self._cache_generation(self._analysis_cache, file_path)
         try:
-            with psycopg2.connect(**self.conn_params) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cur:
-                    query = """
-                        SELECT ar.analysis_type, ar.result, ar.timestamp
-                        FROM analysis_results ar
-                        JOIN files f ON ar.file_id = f.id
-                        WHERE f.path = %s
-                    """
-                    params = [file_path]
                     if analysis_type:
-                        query += " AND ar.analysis_type = %s"
-                        params.append(analysis_type)
-                    query += " ORDER BY ar.timestamp DESC"
+                        cur.execute(
+                            "EXECUTE file_analysis_by_type_stmt (%s, %s, %s)",
+                            (file_path, analysis_type, limit)
+                        )
+                    else:
+                        cur.execute("EXECUTE file_analysis_stmt (%s, %s)", (file_path, limit))
+                    rows = cur.fetchall()
+            self._cache_put(self._analysis_cache, file_path, cache_key, rows, generation)
+            return rows
+        except Exception as e:
+            logger.error("Failed to retrieve analysis: %s", e)
+            raise
+
+    def iter_file_analysis(self, file_path, analysis_type=None, itersize=500):
+        """Stream analysis results for a file, newest first, via a server-side cursor.
+
+        Rows arrive from PostgreSQL in batches of `itersize`; the pooled
+        connection is held until the generator is exhausted or closed.
+        """
+        query = """
+            SELECT ar.analysis_type, ar.result, ar.timestamp
+            FROM analysis_results ar
+            JOIN files f ON ar.file_id = f.id
+            WHERE f.path = %s
+        """
+        params = [file_path]
+        if analysis_type:
+            query += " AND ar.analysis_type = %s"
+            params.append(analysis_type)
+        query += " ORDER BY ar.timestamp DESC"
+        try:
+            with self._conn() as conn:
+                with conn.cursor(name="analysis_stream") as cur:
+                    cur.itersize = itersize
                     cur.execute(query, params)
-                    return cur.fetchall()
+                    yield from cur
         except Exception as e:
-            print(f"<error>Failed to retrieve analysis: {str(e)}</error>")
+            logger.error("Failed to stream analysis: %s", e)
             raise
 
     def get_dependencies(self, file_path, dep_type=None):
         """Get dependencies for a file."""
+        rows = self._cache_get(self._dependency_cache, file_path, dep_type)
+        if rows is not None:
+            return rows
+        generation = self._cache_generation(self._dependency_cache, file_path)
         try:
-            with psycopg2.connect(**self.conn_params) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cur:
-                    query = """
-                        SELECT f2.path, d.dep_type, d.metadata
-                        FROM dependencies d
-                        JOIN files f1 ON d.source_file_id = f1.id
-                        JOIN files f2 ON d.target_file_id = f2.id
-                        WHERE f1.path = %s
-                    """
-                    params = [file_path]
                     if dep_type:
-                        query += " AND d.dep_type = %s"
-                        params.append(dep_type)
-                    cur.execute(query, params)
-                    return cur.fetchall()
+                        cur.execute(
+                            "EXECUTE dependencies_by_type_stmt (%s, %s)",
+                            (file_path, dep_type)
+                        )
+                    else:
+                        cur.execute("EXECUTE dependencies_stmt (%s)", (file_path,))
+                    rows = cur.fetchall()
+            self._cache_put(self._dependency_cache, file_path, dep_type, rows, generation)
+            return rows
         except Exception as e:
-            print(f"<error>Failed to retrieve dependencies: {str(e)}</error>")
+            logger.error("Failed to retrieve dependencies: %s", e)
             raise
@@ -31,4 +31,11 @@ class CodeAssistantAgent:
         return self.agent.run(
             input=query,
             chat_history=chat_history
+        )
+
+    async def aprocess_query(self, query: str, chat_history: list) -> str:
+        """Асинхронный вариант для вызова из цикла событий (бот) без блокировки"""
+        return await self.agent.arun(
+            input=query,
+            chat_history=chat_history
         )
\ No newline at end of file
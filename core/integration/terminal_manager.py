@@ -1,10 +1,17 @@
-import subprocess
+import asyncio
+import re
 import shlex
 from typing import Tuple
 
 class TerminalManager:
+    COMMAND_TIMEOUT = 30
+
     def __init__(self):
         self.safe_commands = ["git pull", "npm install", "ls", "pwd"]
+        # Команда безопасна, только если начинается с разрешенной (а не содержит ее)
+        self._safe_re = re.compile(
+            r'^(?:' + '|'.join(re.escape(c) for c in self.safe_commands) + r')(?:\s|$)'
+        )
         self.user_confirmations = {}
 
     async def execute_command(self, command: str, user_id: str) -> Tuple[str, bool]:
@@ -12,16 +19,25 @@ class TerminalManager:
             return "Command requires approval", False
             
         if self.user_confirmations.get(user_id) == command:
-            result = subprocess.run(
-                shlex.split(command),
-                capture_output=True,
-                text=True,
-                timeout=30
+            # Процесс не блокирует цикл событий, пока выполняется команда
+            proc = await asyncio.create_subprocess_exec(
+                *shlex.split(command),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
-            return result.stdout + result.stderr, True
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(),
+                    timeout=self.COMMAND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
+            return stdout.decode(errors="replace") + stderr.decode(errors="replace"), True
         else:
             self.user_confirmations[user_id] = command
             return "Need approval for: " + command, False
 
     def _is_command_safe(self, command: str) -> bool:
-        return any(cmd in command for cmd in self.safe_commands)
\ No newline at end of file
+        return bool(self._safe_re.match(command.strip()))
\ No newline at end of file
@@ -1,35 +1,121 @@
-import requests
+import asyncio
+import hashlib
+import logging
+import threading
+import httpx
+import redis
+from cachetools import LRUCache
 from googlesearch import search
 from urllib.parse import urlparse
 import json
 
+try:
+    import uvloop
+except ImportError:  # uvloop не поддерживает Windows
+    uvloop = None
+
+# Один фоновый цикл событий и один HTTP/2-клиент на процесс: соединения
+# (включая TLS) переиспользуются между поисками, а синхронные вызовы
+# не создают новый цикл через asyncio.run
+_loop = None
+_client = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="web-search-loop", daemon=True).start()
+        return _loop
+
+
+def _get_client():
+    """HTTP-клиент фонового цикла; вызывается только внутри этого цикла"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=WebSearchManager.FETCH_TIMEOUT,
+            limits=WebSearchManager.FETCH_LIMITS,
+            follow_redirects=True
+        )
+    return _client
+
+
 class WebSearchManager:
+    FETCH_TIMEOUT = 5
+    FETCH_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=16)
+    CACHE_TTL = 3600  # секунд
+
     def __init__(self):
-        self.search_cache = {}
+        # Общий для всех воркеров кэш в Redis + небольшой локальный поверх него
+        self.redis = redis.Redis(host='localhost', port=6379, db=0)
+        self.search_cache = LRUCache(maxsize=256)
+        self.logger = logging.getLogger(__name__)
 
     def google_search(self, query: str, num_results=3) -> list:
-        if query in self.search_cache:
-            return self.search_cache[query]
-        
-        results = []
+        key = self._cache_key(query, num_results)
+        if key in self.search_cache:
+            return self.search_cache[key]
+
+        cached = self._redis_get(key)
+        if cached is not None:
+            self.search_cache[key] = cached
+            return cached
+
         try:
-            for url in search(query, num_results=num_results):
-                if self._is_reliable_source(url):
-                    content = self._extract_content(url)
-                    results.append({"url": url, "content": content[:500]})
-            
-            self.search_cache[query] = results
+            urls = [
+                url for url in search(query, num_results=num_results)
+                if self._is_reliable_source(url)
+            ]
+            # Страницы загружаются одновременно: общее время ~ самой медленной
+            contents = asyncio.run_coroutine_threadsafe(
+                self._fetch_all(urls), _get_loop()
+            ).result()
+            results = [
+                {"url": url, "content": content[:500]}
+                for url, content in zip(urls, contents)
+            ]
+
+            self.search_cache[key] = results
+            self._redis_set(key, results)
             return results
         except Exception as e:
             return [{"error": str(e)}]
 
+    def _cache_key(self, query: str, num_results: int) -> str:
+        digest = hashlib.blake2s(f"{num_results}:{query}".encode()).hexdigest()
+        return f"websearch:{digest}"
+
+    def _redis_get(self, key: str):
+        try:
+            data = self.redis.get(key)
+            return json.loads(data) if data else None
+        except redis.exceptions.RedisError as e:
+            self.logger.warning(f"Search cache read failed: {str(e)}")
+            return None
+
+    def _redis_set(self, key: str, results: list):
+        try:
+            self.redis.setex(key, self.CACHE_TTL, json.dumps(results))
+        except redis.exceptions.RedisError as e:
+            self.logger.warning(f"Search cache write failed: {str(e)}")
+
     def _is_reliable_source(self, url: str) -> bool:
         domain = urlparse(url).netloc
         return any(d in domain for d in ["stackoverflow", "github", "official-docs"])
 
-    def _extract_content(self, url: str) -> str:
+    async def _fetch_all(self, urls: list) -> list:
+        client = _get_client()
+        return await asyncio.gather(
+            *(self._extract_content(client, url) for url in urls)
+        )
+
+    async def _extract_content(self, client: httpx.AsyncClient, url: str) -> str:
         try:
-            response = requests.get(url, timeout=5)
+            response = await client.get(url)
             return response.text
-        except:
-            return ""
\ No newline at end of file
+        except Exception:
+            return ""
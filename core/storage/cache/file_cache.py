@@ -1,16 +1,23 @@
 from pathlib import Path
+import base64
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 from .layered_cache import CacheBackend
 from datetime import datetime, timedelta
 
 class FileSystemCache(CacheBackend):
+    MGET_WORKERS = 8
+
     def __init__(self, cache_dir=".cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
 
     def _get_path(self, key: str) -> Path:
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return self.cache_dir / key_hash[:2] / key_hash[2:4] / key_hash
+        # 128-битный blake2b в base32: 26 символов вместо 32 hex, регистр не важен
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        name = base64.b32encode(digest).rstrip(b"=").decode()
+        return self.cache_dir / name[:2] / name[2:4] / name
 
     def get(self, key: str) -> Optional[bytes]:
         path = self._get_path(key)
@@ -20,6 +27,14 @@ class FileSystemCache(CacheBackend):
         with open(path, "rb") as f:
             return f.read()
 
+    def mget(self, keys: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Параллельное чтение файлов: операции упираются в задержку ФС"""
+        keys = list(keys)
+        if len(keys) < 2:
+            return {key: self.get(key) for key in keys}
+        with ThreadPoolExecutor(max_workers=min(self.MGET_WORKERS, len(keys))) as pool:
+            return dict(zip(keys, pool.map(self.get, keys)))
+
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None):
         path = self._get_path(key)
         path.parent.mkdir(exist_ok=True, parents=True)
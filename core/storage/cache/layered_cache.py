@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 import logging
 from datetime import timedelta
 
@@ -18,6 +18,27 @@ class LayeredCache:
                 return value
         return None
 
+    def mget(self, keys: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Пакетное чтение: в следующий бэкенд уходят только промахи"""
+        result = dict.fromkeys(keys)
+        missing = list(result)
+        for backend in self.backends:
+            if not missing:
+                break
+            found = backend.mget(missing)
+            still_missing = []
+            for key in missing:
+                if value := found.get(key):
+                    result[key] = value
+                else:
+                    still_missing.append(key)
+            self.logger.debug(
+                f"Cache mget in {backend.__class__.__name__}: "
+                f"{len(missing) - len(still_missing)}/{len(missing)} hits"
+            )
+            missing = still_missing
+        return result
+
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None):
         """Запись во все бэкенды"""
         for backend in self.backends:
@@ -30,5 +51,8 @@ class CacheBackend:
     def get(self, key: str) -> Optional[bytes]:
         raise NotImplementedError
 
+    def mget(self, keys: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        return {key: self.get(key) for key in keys}
+
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None):
         raise NotImplementedError
\ No newline at end of file
@@ -1,5 +1,6 @@
 import redis
 from datetime import timedelta
+from typing import Dict, Iterable, Optional
 from .layered_cache import CacheBackend
 
 class RedisCache(CacheBackend):
@@ -14,6 +15,12 @@ class RedisCache(CacheBackend):
     def get(self, key: str) -> Optional[bytes]:
         return self.client.get(key)
 
+    def mget(self, keys: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        return dict(zip(keys, self.client.mget(keys)))
+
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None):
         self.client.set(
             name=key,
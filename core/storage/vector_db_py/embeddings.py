@@ -1,51 +1,150 @@
 import faiss
+import math
 import numpy as np
+import os
+import pickle
+import torch
 from sentence_transformers import SentenceTransformer
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+
+
+class Hit(NamedTuple):
+    """Search result: the stored item (shared, not copied) and its similarity score."""
+    item: Dict[str, Any]
+    score: float
+
 
 class EmbeddingManager:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        """Initialize the embedding manager with a specific model."""
+    ENCODE_BATCH_SIZE = 32
+
+    # Параметры приближенных индексов
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    IVF_NPROBE = 16  # inverted lists scanned per query (faiss default is 1)
+    IVF_NLIST = 1024  # верхняя граница; фактическое число списков зависит от объема обучения
+    PQ_M = 48  # размерность модели должна делиться на PQ_M
+    PQ_NBITS = 8
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', num_threads: Optional[int] = None):
+        """Initialize the embedding manager with a specific model.
+
+        num_threads sets the OpenMP thread count FAISS uses for batch search
+        (defaults to all CPUs).
+        """
         self.model = SentenceTransformer(model_name)
+        self.model.eval()
         self.index = None
+        self._index_type = None
         self.id_to_data = {}  # Map IDs to original data
         self.next_id = 0
         
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
+        
+        faiss.omp_set_num_threads(num_threads or os.cpu_count() or 1)
+        # SIMD level of the installed wheel (e.g. AVX2), decides which search kernels are used
+        self.logger.info("FAISS compile options: %s", faiss.get_compile_options())
 
     def create_index(self, dimension: int, index_type: str = 'l2') -> None:
-        """Create a new FAISS index."""
+        """Create a new FAISS index.
+
+        'l2' and 'cosine' are exact brute-force indexes; 'hnsw' (graph) and
+        'ivfpq' (inverted lists + product quantization) search sub-linearly.
+        'sq8' and 'fp16' are brute-force over scalar-quantized vectors
+        (4x and 2x smaller than float32). Indexes that need training
+        ('ivfpq', 'sq8') are trained on the first batch passed to add_items;
+        for 'ivfpq' the number of lists and PQ code size are derived from
+        that batch's size. 'hnsw' does not support remove_items.
+        """
         try:
             if index_type == 'l2':
-                self.index = faiss.IndexFlatL2(dimension)
+                base = faiss.IndexFlatL2(dimension)
             elif index_type == 'cosine':
-                self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+                base = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+            elif index_type == 'hnsw':
+                base = faiss.IndexHNSWFlat(dimension, self.HNSW_M)
+                base.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+                base.hnsw.efSearch = self.HNSW_EF_SEARCH
+            elif index_type == 'ivfpq':
+                if dimension % self.PQ_M:
+                    raise ValueError(
+                        f"'ivfpq' needs a dimension divisible by PQ_M={self.PQ_M}, got {dimension}"
+                    )
+                # Rebuilt with parameters fitted to the training batch in _train
+                base = self._ivfpq(dimension, self.IVF_NLIST, self.PQ_NBITS)
+            elif index_type == 'sq8':
+                base = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit)
+            elif index_type == 'fp16':
+                base = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16)
             else:
                 raise ValueError(f"Unsupported index type: {index_type}")
+
+            # Flat/HNSW/IVF indexes keep sequential ids; the map stores our own ids
+            self.index = faiss.IndexIDMap2(base)
+            self._index_type = index_type
             
-            print(f"<self>Created {index_type} index with dimension {dimension}</self>")
+            self.logger.info("Created %s index with dimension %d", index_type, dimension)
             
         except Exception as e:
-            print(f"<error>Failed to create index: {str(e)}</error>")
+            self.logger.error("Failed to create index: %s", e)
             raise
 
+    def _ivfpq(self, dimension: int, nlist: int, nbits: int):
+        self._quantizer = faiss.IndexFlatL2(dimension)  # must outlive the index
+        return faiss.IndexIVFPQ(self._quantizer, dimension, nlist, self.PQ_M, nbits)
+
+    def _train(self, embeddings: np.ndarray) -> None:
+        """Train an empty index on the first batch.
+
+        k-means needs at least as many points as centroids, so for 'ivfpq'
+        nlist (~4*sqrt(n), at most IVF_NLIST) and the PQ code size (at most
+        PQ_NBITS, 2**nbits <= n) are chosen from the batch size.
+        """
+        n = len(embeddings)
+        if self._index_type == 'ivfpq':
+            nlist = min(self.IVF_NLIST, n, max(1, int(4 * math.sqrt(n))))
+            nbits = min(self.PQ_NBITS, max(1, int(math.log2(n)) if n else 1))
+            self.index = faiss.IndexIDMap2(self._ivfpq(self.index.d, nlist, nbits))
+            self.logger.info("Training ivfpq index on %d vectors: nlist=%d, nbits=%d", n, nlist, nbits)
+        self.index.train(embeddings)
+        self._set_nprobe()
+
+    def _set_nprobe(self) -> None:
+        """Scan IVF_NPROBE inverted lists per query on IVF indexes."""
+        try:
+            ivf = faiss.extract_index_ivf(self.index)
+        except RuntimeError:  # not an IVF index
+            return
+        ivf.nprobe = min(self.IVF_NPROBE, ivf.nlist)
+
+    def _encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """Encode texts in batches; normalization is fused into the encode pass."""
+        with torch.inference_mode():
+            return self.model.encode(
+                texts,
+                batch_size=self.ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=normalize
+            )
+
+    def _is_cosine(self) -> bool:
+        return self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
     def add_items(self, items: List[Dict[str, Any]]) -> List[int]:
         """Add items to the index."""
         try:
             # Extract text for embedding
             texts = [item['text'] for item in items]
             
-            # Generate embeddings
-            embeddings = self.model.encode(texts)
-            
+            # Generate embeddings (normalized for cosine similarity if using IP index)
             if self.index is None:
-                self.create_index(embeddings.shape[1])
+                self.create_index(self.model.get_sentence_embedding_dimension())
+            embeddings = self._encode(texts, normalize=self._is_cosine())
             
-            # Normalize for cosine similarity if using IP index
-            if isinstance(self.index, faiss.IndexFlatIP):
-                faiss.normalize_L2(embeddings)
+            if not self.index.is_trained:
+                self._train(embeddings)
             
             # Assign IDs and add to index
             ids = np.arange(self.next_id, self.next_id + len(items))
@@ -56,75 +155,46 @@ class EmbeddingManager:
                 self.id_to_data[int(id_)] = item
             
             self.next_id += len(items)
-            print(f"<self>Added {len(items)} items to index</self>")
+            self.logger.debug("Added %d items to index", len(items))
             
             return ids.tolist()
             
         except Exception as e:
-            print(f"<error>Failed to add items: {str(e)}</error>")
+            self.logger.error("Failed to add items: %s", e)
             raise
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, k: int = 5) -> List[Hit]:
         """Search for similar items."""
-        try:
-            if self.index is None:
-                raise ValueError("Index not initialized")
-            
-            # Generate query embedding
-            query_vector = self.model.encode([query])[0].reshape(1, -1)
-            
-            # Normalize for cosine similarity if using IP index
-            if isinstance(self.index, faiss.IndexFlatIP):
-                faiss.normalize_L2(query_vector)
-            
-            # Search
-            distances, indices = self.index.search(query_vector, k)
-            
-            # Format results
-            results = []
-            for dist, idx in zip(distances[0], indices[0]):
-                if idx != -1:  # Valid index
-                    item = self.id_to_data[int(idx)].copy()
-                    item['score'] = float(1 / (1 + dist))  # Convert distance to similarity score
-                    results.append(item)
-            
-            return results
-            
-        except Exception as e:
-            print(f"<error>Search failed: {str(e)}</error>")
-            raise
+        return self.batch_search([query], k)[0]
 
-    def batch_search(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+    def batch_search(self, queries: List[str], k: int = 5) -> List[List[Hit]]:
         """Perform batch search for multiple queries."""
         try:
             if self.index is None:
                 raise ValueError("Index not initialized")
             
-            # Generate query embeddings
-            query_vectors = self.model.encode(queries)
-            
-            # Normalize for cosine similarity if using IP index
-            if isinstance(self.index, faiss.IndexFlatIP):
-                faiss.normalize_L2(query_vectors)
+            # Generate query embeddings (normalized for cosine similarity if using IP index)
+            query_vectors = self._encode(queries, normalize=self._is_cosine())
             
             # Batch search
             distances, indices = self.index.search(query_vectors, k)
             
+            # Convert distances to similarity scores in one vectorized pass
+            scores = (1.0 / (1.0 + distances)).tolist()
+            
             # Format results
-            all_results = []
-            for query_distances, query_indices in zip(distances, indices):
-                query_results = []
-                for dist, idx in zip(query_distances, query_indices):
-                    if idx != -1:
-                        item = self.id_to_data[int(idx)].copy()
-                        item['score'] = float(1 / (1 + dist))
-                        query_results.append(item)
-                all_results.append(query_results)
-            
-            return all_results
+            id_to_data = self.id_to_data
+            return [
+                [
+                    Hit(id_to_data[idx], score)
+                    for score, idx in zip(query_scores, query_indices)
+                    if idx != -1  # Valid index
+                ]
+                for query_scores, query_indices in zip(scores, indices.tolist())
+            ]
             
         except Exception as e:
-            print(f"<error>Batch search failed: {str(e)}</error>")
+            self.logger.error("Batch search failed: %s", e)
             raise
 
     def remove_items(self, ids: List[int]) -> None:
@@ -132,6 +202,10 @@ class EmbeddingManager:
         try:
             if self.index is None:
                 raise ValueError("Index not initialized")
+            # HNSW graphs cannot delete nodes; faiss would throw from remove_ids
+            base = getattr(self.index, "index", self.index)  # under IndexIDMap2
+            if isinstance(faiss.downcast_index(base), faiss.IndexHNSW):
+                raise ValueError("Removal is not supported for 'hnsw' indexes; rebuild the index instead")
             
             # Remove from FAISS index
             self.index.remove_ids(np.array(ids))
@@ -140,10 +214,10 @@ class EmbeddingManager:
             for id_ in ids:
                 self.id_to_data.pop(id_, None)
             
-            print(f"<self>Removed {len(ids)} items from index</self>")
+            self.logger.debug("Removed %d items from index", len(ids))
             
         except Exception as e:
-            print(f"<error>Failed to remove items: {str(e)}</error>")
+            self.logger.error("Failed to remove items: %s", e)
             raise
 
     def save_index(self, path: str) -> None:
@@ -155,31 +229,38 @@ class EmbeddingManager:
             faiss.write_index(self.index, f"{path}.index")
             
             # Save mapping data
-            np.save(f"{path}_mapping.npy", {
-                'id_to_data': self.id_to_data,
-                'next_id': self.next_id
-            })
+            with open(f"{path}_mapping.pkl", "wb") as f:
+                pickle.dump({
+                    'id_to_data': self.id_to_data,
+                    'next_id': self.next_id
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
             
-            print(f"<self>Saved index to {path}</self>")
+            self.logger.info("Saved index to %s", path)
             
         except Exception as e:
-            print(f"<error>Failed to save index: {str(e)}</error>")
+            self.logger.error("Failed to save index: %s", e)
             raise
 
     def load_index(self, path: str) -> None:
         """Load a FAISS index from disk."""
         try:
             self.index = faiss.read_index(f"{path}.index")
+            self._index_type = None  # loaded indexes are already trained
+            self._set_nprobe()
             
-            # Load mapping data
-            data = np.load(f"{path}_mapping.npy", allow_pickle=True).item()
+            # Load mapping data (fall back to the legacy numpy object-array format)
+            if os.path.exists(f"{path}_mapping.pkl"):
+                with open(f"{path}_mapping.pkl", "rb") as f:
+                    data = pickle.load(f)
+            else:
+                data = np.load(f"{path}_mapping.npy", allow_pickle=True).item()
             self.id_to_data = data['id_to_data']
             self.next_id = data['next_id']
             
-            print(f"<self>Loaded index from {path}</self>")
+            self.logger.info("Loaded index from %s", path)
             
         except Exception as e:
-            print(f"<error>Failed to load index: {str(e)}</error>")
+            self.logger.error("Failed to load index: %s", e)
             raise
 
 
@@ -198,4 +279,4 @@ class SentenceTransformerEmbedder(Embedder):
         self.model = SentenceTransformer(model_name)
     
     def encode(self, text: str) -> np.ndarray:
-        return self.model.encode(text)
\ No newline at end of file
+        return self.model.encode(text)
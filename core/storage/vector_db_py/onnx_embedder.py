@@ -0,0 +1,78 @@
+"""
+Эмбеддинги через ONNX Runtime.
+
+Модуль отделен от embeddings.py, чтобы путь ONNX не зависел от faiss и
+torch: их отсутствие не должно выглядеть как "ONNX недоступен".
+"""
+
+import os
+import re
+from typing import Optional
+
+import numpy as np
+
+
+class OnnxEmbedder:
+    """Модель sentence-transformers, экспортированная в ONNX Runtime.
+
+    На CPU кодирует в несколько раз быстрее PyTorch; интерфейс encode
+    совместим с SentenceTransformer.encode (mean pooling, как в MiniLM).
+    Экспорт в ONNX выполняется один раз и сохраняется в EXPORT_DIR,
+    следующие запуски загружают готовую модель.
+    """
+    MAX_SEQ_LENGTH = 256  # как max_seq_length у all-MiniLM-L6-v2
+    EXPORT_DIR = ".cache/onnx"  # экспортированные модели, по подкаталогу на модель
+
+    def __init__(self, model_name: str, provider: Optional[str] = None):
+        self.model_name = model_name
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        if provider is None:
+            provider = (
+                'CUDAExecutionProvider'
+                if 'CUDAExecutionProvider' in onnxruntime.get_available_providers()
+                else 'CPUExecutionProvider'
+            )
+
+        export_path = os.path.join(self.EXPORT_DIR, re.sub(r'[^\w.-]', '_', model_name))
+        if os.path.isfile(os.path.join(export_path, 'model.onnx')):
+            self.tokenizer = AutoTokenizer.from_pretrained(export_path, use_fast=True)
+            self.model = ORTModelForFeatureExtraction.from_pretrained(
+                export_path, provider=provider
+            )
+        else:
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            self.model = ORTModelForFeatureExtraction.from_pretrained(
+                model_name, export=True, provider=provider
+            )
+            self.model.save_pretrained(export_path)
+            self.tokenizer.save_pretrained(export_path)
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.MAX_SEQ_LENGTH,
+                return_tensors='np'
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+
+            # Mean pooling по токенам без паддинга
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+            batches.append(embeddings.astype(np.float32))
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
@@ -1,30 +1,116 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client import grpc as qgrpc
+from qdrant_client.conversions.conversion import payload_to_grpc
+from qdrant_client.models import (
+    Distance, VectorParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType
+)
+import asyncio
+import atexit
 import logging
-from typing import List, Dict, Optional
+import os
+import threading
+import time
+import uuid
+import weakref
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 import yaml
 import hashlib
+import numpy as np
+from diskcache import Cache
+
+# Один клиент на адрес сервера: все экземпляры VectorSearchEngine
+# используют общие gRPC-каналы вместо открытия своих
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Движки с неотправленным буфером точек; один atexit-хук на все экземпляры,
+# WeakSet не продлевает им жизнь до конца процесса
+_engines = weakref.WeakSet()
+
+
+def _flush_engines():
+    for engine in list(_engines):
+        try:
+            engine.flush()
+        except Exception:
+            # flush уже записал ошибку в лог; остальные движки все равно сбрасываем
+            pass
+
+
+atexit.register(_flush_engines)
+
+
+def _get_client(config: dict) -> QdrantClient:
+    key = (config['host'], config['port'])
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = QdrantClient(
+                host=config['host'],
+                port=config['port'],
+                api_key=config.get('api_key'),
+                prefer_grpc=True,
+                pool_size=config.get('pool_size', VectorSearchEngine.POOL_SIZE),
+                timeout=VectorSearchEngine.CLIENT_TIMEOUT
+            )
+            _clients[key] = client
+        return client
+
+
+class _SearchBatch:
+    """Поисковые запросы из разных потоков, собранные в один SearchBatch"""
+    __slots__ = ("requests", "done", "results", "error")
 
-class VectorSearchEngine:
     def __init__(self):
+        self.requests: List[Tuple[list, int]] = []
+        self.done = threading.Event()
+        self.results: Optional[List[List[Dict]]] = None
+        self.error: Optional[BaseException] = None
+
+
+class VectorSearchEngine:
+    ENCODE_BATCH_SIZE = 64
+    ENCODE_CACHE_SIZE = 2000
+    EMBED_CACHE_DIR = ".cache/embeddings"  # переживает перезапуски процесса
+    UPSERT_BUFFER_SIZE = 256  # точек в одном upsert
+    POOL_SIZE = 32  # соединений клиента, если в конфиге не задан pool_size
+    CLIENT_TIMEOUT = 60
+    # Окно (сек), в которое параллельные search_files объединяются в один
+    # запрос к Qdrant; 0 - без объединения
+    SEARCH_COALESCE_WINDOW = 0.01
+    # Горячий путь идет через сырые gRPC-структуры, минуя валидацию pydantic
+    SEARCH_PAYLOAD = qgrpc.WithPayloadSelector(
+        include=qgrpc.PayloadIncludeSelector(fields=["file_path", "content"])
+    )
+
+    def __init__(self, collection_name: str = "code_vectors"):
         self.client = None
         self.embedder = None
-        self.collection_name = "code_vectors"
+        self.model_name = None
+        self.collection_name = collection_name
         self.logger = logging.getLogger(__name__)
+        # Точки копятся и пишутся пачками; остаток сбрасывается при выходе
+        self._buffer: List[qgrpc.PointStruct] = []
+        self._buffer_lock = threading.Lock()
+        self._aclient = None
+        # Текущая собираемая пачка поисковых запросов (см. search_files)
+        self._search_batch: Optional[_SearchBatch] = None
+        self._search_batch_lock = threading.Lock()
+        self._active_searches = 0  # потоков внутри search_files
+        # Кэш на экземпляре, чтобы self не попадал в ключ lru_cache
+        self._encode_cache = lru_cache(maxsize=self.ENCODE_CACHE_SIZE)(self._encode_raw)
+        self._disk = Cache(self.EMBED_CACHE_DIR)
         self._init_client()
+        _engines.add(self)
 
     def _init_client(self):
         """Инициализация подключения из конфига"""
         with open("config/base_config.yaml") as f:
             config = yaml.safe_load(f)['vector_db']['qdrant']
 
-        self.client = QdrantClient(
-            host=config['host'],
-            port=config['port'],
-            api_key=config.get('api_key'),
-            prefer_grpc=True
-        )
-        
+        self._config = config
+        self.client = _get_client(config)
         self._create_collection()
 
     def _create_collection(self):
@@ -35,82 +121,378 @@ class VectorSearchEngine:
                 vectors_config=VectorParams(
                     size=384,  # Для all-MiniLM-L6-v2
                     distance=Distance.COSINE
+                ),
+                # int8-копия векторов в RAM для поиска (в 4 раза меньше float32),
+                # исходные векторы остаются для пересчета оценок
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
                 )
             )
             self.logger.info("Created new Qdrant collection")
 
-    def init_embedder(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        """Инициализация модели эмбеддингов"""
-        from sentence_transformers import SentenceTransformer
-        self.embedder = SentenceTransformer(model_name)
-        self.logger.info(f"Initialized embedder: {model_name}")
+    def init_embedder(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                      backend: str = "onnx"):
+        """Инициализация модели эмбеддингов
+
+        backend="onnx" - ONNX Runtime (быстрее на CPU); если optimum/onnxruntime
+        не установлены, используется PyTorch.
+        """
+        if backend == "onnx":
+            try:
+                from core.storage.vector_db_py.onnx_embedder import OnnxEmbedder
+                self.embedder = OnnxEmbedder(model_name)
+            except ImportError as e:
+                self.logger.warning(f"ONNX Runtime unavailable, falling back to PyTorch: {str(e)}")
+                backend = "torch"
+
+        if backend == "torch":
+            import torch
+            from sentence_transformers import SentenceTransformer
+            torch.set_num_threads(os.cpu_count() or 1)
+            self.embedder = SentenceTransformer(model_name)
+            if torch.cuda.is_available():
+                self.embedder.half()  # FP16 на GPU
+
+        self.model_name = model_name
+        self._encode_cache.cache_clear()  # векторы прежней модели несовместимы
+        self.logger.info(f"Initialized embedder: {model_name} ({backend})")
 
     def _generate_file_id(self, file_path: str) -> str:
-        """Генерация уникального ID для файла"""
-        return hashlib.sha256(file_path.encode()).hexdigest()
+        """Генерация уникального ID для файла (128 бит = UUID, который принимает Qdrant)"""
+        return hashlib.blake2b(file_path.encode(), digest_size=16).hexdigest()
 
     def add_file(self, file_path: str, content: str, metadata: dict) -> bool:
         """Добавление файла в векторную БД"""
+        return self.add_files([(file_path, content, metadata)])
+
+    def add_files(self, files: List[Tuple[str, str, dict]]) -> bool:
+        """Пакетное добавление файлов: (file_path, content, metadata)
+
+        Тексты кодируются мини-батчами, отсортированными по длине, чтобы
+        в одном батче было меньше паддинга; результат пишется одним upsert.
+        """
         if not self.embedder:
             raise ValueError("Embedder not initialized")
-        
+        if not files:
+            return True
+
         try:
-            # Генерация эмбеддинга
-            vector = self.embedder.encode(content).tolist()
-            
-            # Создание точки данных
-            point = PointStruct(
-                id=self._generate_file_id(file_path),
-                vector=vector,
-                payload={
+            # Файлы с тем же содержимым уже проиндексированы: не кодируем их заново
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[self._generate_file_id(file_path) for file_path, _, _ in files],
+                with_payload=["content_sha"],
+                with_vectors=False
+            )
+            files = self._changed_files(files, records)
+            if not files:
+                return True
+
+            points = self._build_points(files, self._encode_texts([c for _, c, _ in files]))
+            with self._buffer_lock:
+                self._buffer.extend(points)
+                full = len(self._buffer) >= self.UPSERT_BUFFER_SIZE
+            if full:
+                # Фоновая запись: подтверждение не ждет применения точек
+                self.flush(wait=False)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error adding files: {str(e)}")
+            return False
+
+    def _encode_texts(self, texts: List[str]) -> list:
+        """Кодирование мини-батчами, отсортированными по длине (меньше паддинга),
+        с возвратом векторов в исходном порядке"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        sorted_vectors = self.embedder.encode(
+            [texts[i] for i in order],
+            batch_size=self.ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+
+        vectors = [None] * len(texts)
+        for pos, i in enumerate(order):
+            vectors[i] = sorted_vectors[pos]
+        return vectors
+
+    @staticmethod
+    def _content_hash(content: str) -> str:
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def _changed_files(self, files: List[Tuple[str, str, dict]], records) -> List[Tuple[str, str, dict]]:
+        """Файлы, содержимое которых отличается от сохраненного в Qdrant;
+        хэш содержимого добавляется в их metadata (payload content_sha)"""
+        # Qdrant возвращает UUID в каноническом виде с дефисами
+        known = {uuid.UUID(str(record.id)).hex: (record.payload or {}).get("content_sha") for record in records}
+        changed = []
+        for file_path, content, metadata in files:
+            content_sha = self._content_hash(content)
+            if known.get(self._generate_file_id(file_path)) != content_sha:
+                changed.append((file_path, content, {**metadata, "content_sha": content_sha}))
+        return changed
+
+    def _build_points(self, files: List[Tuple[str, str, dict]], vectors: list) -> List[qgrpc.PointStruct]:
+        return [
+            qgrpc.PointStruct(
+                id=qgrpc.PointId(uuid=self._generate_file_id(file_path)),
+                vectors=qgrpc.Vectors(vector=qgrpc.Vector(data=vector.tolist())),
+                payload=payload_to_grpc({
                     "file_path": file_path,
                     "content": content[:1000],  # Сохраняем сокращенный контент
                     **metadata
-                }
+                })
             )
-            
-            # Сохранение в Qdrant
-            self.client.upsert(
+            for (file_path, content, metadata), vector in zip(files, vectors)
+        ]
+
+    def flush(self, wait: bool = True):
+        """Запись накопленных точек в Qdrant одним запросом
+
+        wait=True (по умолчанию) возвращается только после применения точек,
+        чтобы следующий поиск их видел.
+        """
+        with self._buffer_lock:
+            points, self._buffer = self._buffer, []
+        if not points:
+            return
+
+        try:
+            self.client.grpc_points.Upsert(
+                qgrpc.UpsertPoints(
+                    collection_name=self.collection_name,
+                    wait=wait,
+                    points=points
+                )
+            )
+        except Exception as e:
+            self.logger.error(f"Error flushing {len(points)} points: {str(e)}")
+            raise
+
+    def encode_cached(self, text: str) -> list:
+        """Эмбеддинг запроса с LRU-кэшем (повторные запросы не кодируются заново)"""
+        if not self.embedder:
+            raise ValueError("Embedder not initialized")
+        return self._encode_cache(text)
+
+    def _disk_key(self, text: str) -> str:
+        return f"{self.model_name}:{hashlib.blake2b(text.encode(), digest_size=16).hexdigest()}"
+
+    def _encode_raw(self, text: str) -> list:
+        """Промах LRU: сначала дисковый кэш, затем модель"""
+        key = self._disk_key(text)
+        vector = self._disk.get(key)
+        if vector is None:
+            vector = self.embedder.encode(
+                text,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            # На диске float16: вдвое меньше места, точности для поиска хватает
+            self._disk[key] = vector.astype(np.float16)
+        return vector.astype(np.float32).tolist()
+
+    def warmup(self, queries: List[str]):
+        """Предварительный расчет эмбеддингов частых запросов (например, при старте бота)"""
+        if not self.embedder:
+            raise ValueError("Embedder not initialized")
+
+        missing = [q for q in dict.fromkeys(queries) if self._disk_key(q) not in self._disk]
+        if missing:
+            vectors = self._encode_texts(missing)
+            for query, vector in zip(missing, vectors):
+                self._disk[self._disk_key(query)] = vector.astype(np.float16)
+        # Заодно заполняем LRU в памяти
+        for query in queries:
+            self._encode_cache(query)
+        self.logger.info(f"Embedding cache warmed up: {len(missing)} new of {len(queries)} queries")
+
+    def search_files(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Поиск по векторной БД
+
+        Запросы из параллельных потоков (например, обработчиков бота),
+        пришедшие в течение SEARCH_COALESCE_WINDOW, уходят в Qdrant одним
+        SearchBatch: первый поток ждет окно и выполняет пачку, остальные
+        получают свои результаты из нее. Одиночный поиск (других в работе
+        нет) выполняется сразу, без ожидания окна.
+        """
+        vector = self.encode_cached(query)
+        if self.SEARCH_COALESCE_WINDOW <= 0:
+            return self._search_vectors([vector], top_k)[0]
+
+        with self._search_batch_lock:
+            self._active_searches += 1
+            batch = self._search_batch
+            alone = batch is None and self._active_searches == 1
+            if not alone:
+                leader = batch is None
+                if leader:
+                    batch = self._search_batch = _SearchBatch()
+                index = len(batch.requests)
+                batch.requests.append((vector, top_k))
+
+        try:
+            if alone:
+                return self._search_vectors([vector], top_k)[0]
+
+            if leader:
+                time.sleep(self.SEARCH_COALESCE_WINDOW)
+                with self._search_batch_lock:
+                    self._search_batch = None  # новые запросы начнут следующую пачку
+                try:
+                    batch.results = self._search_requests(batch.requests)
+                except BaseException as e:
+                    batch.error = e
+                finally:
+                    batch.done.set()
+            else:
+                batch.done.wait()
+        finally:
+            with self._search_batch_lock:
+                self._active_searches -= 1
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def search_payloads(self, query: str, top_k: int = 5,
+                        score_threshold: Optional[float] = None) -> List[Tuple[Dict, float]]:
+        """Поиск с полным payload точек: (payload, score), не хуже score_threshold"""
+        vector = self.encode_cached(query)
+        self.flush()
+        results = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=vector,
+            limit=top_k,
+            score_threshold=score_threshold,
+            with_payload=True
+        )
+        return [(hit.payload, hit.score) for hit in results]
+
+    def search_files_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """Поиск по нескольким запросам: одно кодирование и один запрос к Qdrant"""
+        if not self.embedder:
+            raise ValueError("Embedder not initialized")
+        if not queries:
+            return []
+
+        query_vectors = self.embedder.encode(
+            queries,
+            batch_size=self.ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return self._search_vectors(query_vectors.tolist(), top_k)
+
+    def _search_vectors(self, vectors: List[list], top_k: int) -> List[List[Dict]]:
+        return self._search_requests([(vector, top_k) for vector in vectors])
+
+    def _search_requests(self, requests: List[Tuple[list, int]]) -> List[List[Dict]]:
+        """Один SearchBatch для пар (вектор, top_k)"""
+        self.flush()  # поиск должен видеть уже добавленные файлы
+
+        response = self.client.grpc_points.SearchBatch(
+            qgrpc.SearchBatchPoints(
+                collection_name=self.collection_name,
+                search_points=[
+                    qgrpc.SearchPoints(
+                        collection_name=self.collection_name,
+                        vector=vector,
+                        limit=top_k,
+                        with_payload=self.SEARCH_PAYLOAD
+                    )
+                    for vector, top_k in requests
+                ]
+            )
+        )
+        return [
+            [self._hit_to_dict(hit) for hit in batch.result]
+            for batch in response.result
+        ]
+
+    def _get_aclient(self) -> AsyncQdrantClient:
+        """Асинхронный клиент создается в цикле событий, где будет использоваться"""
+        if self._aclient is None:
+            config = self._config
+            self._aclient = AsyncQdrantClient(
+                host=config['host'],
+                port=config['port'],
+                api_key=config.get('api_key'),
+                prefer_grpc=True,
+                timeout=self.CLIENT_TIMEOUT
+            )
+        return self._aclient
+
+    async def aadd_files(self, files: List[Tuple[str, str, dict]]) -> bool:
+        """Асинхронная версия add_files: кодирование в потоке, пачки пишутся параллельно"""
+        if not self.embedder:
+            raise ValueError("Embedder not initialized")
+        if not files:
+            return True
+
+        try:
+            aclient = self._get_aclient()
+            records = await aclient.retrieve(
                 collection_name=self.collection_name,
-                wait=True,
-                points=[point]
+                ids=[self._generate_file_id(file_path) for file_path, _, _ in files],
+                with_payload=["content_sha"],
+                with_vectors=False
             )
+            files = self._changed_files(files, records)
+            if not files:
+                return True
+
+            # Модель занята CPU, поэтому не блокирует цикл событий
+            vectors = await asyncio.to_thread(self._encode_texts, [c for _, c, _ in files])
+            points = self._build_points(files, vectors)
+
+            size = self.UPSERT_BUFFER_SIZE
+            await asyncio.gather(*(
+                aclient.upsert(
+                    collection_name=self.collection_name,
+                    points=points[i:i + size],
+                    wait=False
+                )
+                for i in range(0, len(points), size)
+            ))
             return True
         except Exception as e:
-            self.logger.error(f"Error adding file: {str(e)}")
+            self.logger.error(f"Error adding files: {str(e)}")
             return False
 
-    def search_files(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Поиск по векторной БД"""
+    async def asearch_files(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Асинхронный поиск по векторной БД"""
         if not self.embedder:
             raise ValueError("Embedder not initialized")
-        
-        query_vector = self.embedder.encode(query).tolist()
-        results = self.client.search(
+        await asyncio.to_thread(self.flush)
+
+        vector = await asyncio.to_thread(self.encode_cached, query)
+        results = await self._get_aclient().search(
             collection_name=self.collection_name,
-            query_vector=query_vector,
+            query_vector=vector,
             limit=top_k,
-            with_payload=True
+            with_payload=["file_path", "content"]
         )
-        
         return [{
             "file_path": hit.payload['file_path'],
             "score": hit.score,
             "content": hit.payload.get('content', '')
         } for hit in results]
-        
-    @lru_cache(maxsize=1000)
-    def encode_cached(self, text: str) -> list:
-        return self.embedder.encode(text).tolist()
-
-    def search_files(self, query: str):
-        query_vector = self.encode_cached(query)
-        # ... остальная логика ...
-
-    # Использование асинхронного кэша
-    async def get_cached_or_fetch(key: str, coro):
-        if cached := cache.get(key):
-            return cached
-        result = await coro
-        cache.set(key, result)
-        return result
\ No newline at end of file
+
+    @staticmethod
+    def _hit_to_dict(hit) -> Dict:
+        payload = hit.payload
+        content = payload.get('content')
+        return {
+            "file_path": payload['file_path'].string_value,
+            "score": hit.score,
+            "content": content.string_value if content is not None else ''
+        }
+
@@ -1,79 +1,190 @@
 import os
 import json
+import fnmatch
+import re
+import shutil
+import tempfile
+from collections import deque
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-def get_directory_snapshot(root_dir='.', output_file='directory_snapshot.json'):
-    """Создает структурированный слепок файловой системы"""
-    
-    # Исключаемые элементы
-    EXCLUDE = [
-        '__pycache__', 
-        '.git', 
-        '.idea', 
-        'venv', 
-        '.env',
-        'node_modules',
-        '*.pyc',
-        '*.log',
-        '*.tmp',
-        '*.swp'
-    ]
-    
-    def should_skip(path: Path) -> bool:
-        """Определяет, нужно ли пропустить файл/директорию"""
-        if any(pattern in path.name for pattern in EXCLUDE):
-            return True
-        if any(path.match(pattern) for pattern in EXCLUDE):
-            return True
-        return False
-
-    def get_file_info(path: Path) -> dict:
-        """Собирает информацию о файле/директории"""
-        stat = path.stat()
-        return {
-            'name': path.name,
-            'type': 'directory' if path.is_dir() else 'file',
-            'size': stat.st_size,
-            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            'permissions': oct(stat.st_mode)[-3:],
-            'absolute_path': str(path.absolute())
-        }
-
-    def scan_directory(directory: Path) -> list:
-        """Рекурсивно сканирует директорию"""
-        structure = []
-        
+# Потоков для параллельного обхода поддиректорий верхнего уровня:
+# stat/scandir отпускают GIL, поэтому задержки диска перекрываются
+SNAPSHOT_WORKERS = 16
+
+# Исключаемые элементы: точные имена и glob-шаблоны, собранные в одно
+# регулярное выражение один раз при импорте
+_LITERAL = frozenset({
+    '__pycache__',
+    '.git',
+    '.idea',
+    'venv',
+    '.env',
+    'node_modules'
+})
+_GLOB_RE = re.compile('|'.join(
+    fnmatch.translate(pattern) for pattern in ('*.pyc', '*.log', '*.tmp', '*.swp')
+))
+
+
+def _skip(name: str) -> bool:
+    """Определяет, нужно ли пропустить файл/директорию"""
+    return name in _LITERAL or _GLOB_RE.match(name) is not None
+
+
+def _get_file_info(entry: os.DirEntry) -> dict:
+    """Собирает информацию о файле/директории
+
+    DirEntry уже содержит тип и (на Windows) stat из scandir, поэтому
+    лишних системных вызовов на каждую запись нет.
+    """
+    stat = entry.stat(follow_symlinks=False)
+    return {
+        'name': entry.name,
+        'type': 'directory' if entry.is_dir(follow_symlinks=False) else 'file',
+        'size': stat.st_size,
+        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        'permissions': oct(stat.st_mode)[-3:],
+        'absolute_path': entry.path
+    }
+
+
+def _open_dir(dir_path: str):
+    try:
+        return os.scandir(dir_path)
+    except PermissionError:
+        return None
+
+
+def _write_tree(f, dir_path: str):
+    """Итеративный обход в глубину с потоковой записью JSON-массива
+
+    Вместо рекурсии используется стек открытых итераторов scandir: в памяти
+    только текущая ветка, глубина дерева не ограничена лимитом рекурсии.
+    """
+    dumps = json.dumps
+    f.write('[')
+    root_it = _open_dir(dir_path)
+    if root_it is None:
+        f.write(']')
+        return
+
+    stack = [root_it]
+    first = [True]  # пишется ли первый элемент массива на каждом уровне
+    while stack:
         try:
-            for entry in directory.iterdir():
-                if should_skip(entry):
-                    continue
-                
-                entry_info = get_file_info(entry)
-                
-                if entry.is_dir():
-                    entry_info['children'] = scan_directory(entry)
-                
-                structure.append(entry_info)
+            entry = next(stack[-1], None)
         except PermissionError:
-            pass
-            
-        return structure
+            entry = None
+        if entry is None:
+            stack.pop().close()
+            first.pop()
+            # Закрываем children и объект родительской директории
+            f.write(']}' if stack else ']')
+            continue
+        if _skip(entry.name):
+            continue
+
+        if not first[-1]:
+            f.write(', ')
+        first[-1] = False
+
+        entry_info = _get_file_info(entry)
+        child_it = _open_dir(entry.path) if entry_info['type'] == 'directory' else None
+        if child_it is None:
+            if entry_info['type'] == 'directory':
+                entry_info['children'] = []
+            f.write(dumps(entry_info, ensure_ascii=False))
+        else:
+            # Объект остается открытым, пока не будут записаны потомки
+            f.write(dumps(entry_info, ensure_ascii=False)[:-1] + ', "children": [')
+            stack.append(child_it)
+            first.append(True)
+
+
+def _serialize_entry(entry: os.DirEntry):
+    """JSON одной записи верхнего уровня вместе со всем поддеревом
+
+    Поддерево пишется во временный файл, а не в память: одна директория
+    верхнего уровня часто содержит почти весь репозиторий.
+    """
+    spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+    try:
+        entry_info = _get_file_info(entry)
+        if entry_info['type'] != 'directory':
+            spool.write(json.dumps(entry_info, ensure_ascii=False))
+        else:
+            spool.write(json.dumps(entry_info, ensure_ascii=False)[:-1] + ', "children": ')
+            _write_tree(spool, entry.path)
+            spool.write('}')
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+
 
-    # Основная логика
+def _write_root(f, root_path: str):
+    """Корень: каждая запись верхнего уровня обходится в своем потоке,
+    результаты пишутся в исходном порядке. Глубже параллелизма нет,
+    чтобы число потоков не росло вместе с деревом; одновременно в работе
+    не больше SNAPSHOT_WORKERS поддеревьев (и временных файлов)."""
+    root_it = _open_dir(root_path)
+    if root_it is None:
+        f.write('[]')
+        return
+    with root_it:
+        top = [entry for entry in root_it if not _skip(entry.name)]
+
+    f.write('[')
+    with ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS) as executor:
+        pending = deque()
+        entries = iter(top)
+        for entry in entries:
+            pending.append(executor.submit(_serialize_entry, entry))
+            if len(pending) >= SNAPSHOT_WORKERS:
+                break
+        first = True
+        try:
+            while pending:
+                with pending.popleft().result() as spool:
+                    if not first:
+                        f.write(', ')
+                    first = False
+                    shutil.copyfileobj(spool, f)
+                entry = next(entries, None)
+                if entry is not None:
+                    pending.append(executor.submit(_serialize_entry, entry))
+        finally:
+            # При ошибке закрываем уже готовые временные файлы
+            for future in pending:
+                future.cancel()
+                if not future.cancelled() and future.exception() is None:
+                    future.result().close()
+    f.write(']')
+
+
+def get_directory_snapshot(root_dir='.', output_file='directory_snapshot.json'):
+    """Создает структурированный слепок файловой системы
+
+    Структура пишется в файл по мере обхода и целиком в памяти не строится,
+    поэтому функция возвращает путь к файлу слепка, а не словарь слепка
+    (как раньше). Прочитать слепок: json.load(open(путь, encoding='utf-8')).
+    Формат JSON прежний (root, timestamp, structure), но без отступов.
+    """
     root_path = Path(root_dir).resolve()
-    snapshot = {
-        'root': str(root_path),
-        'timestamp': datetime.now().isoformat(),
-        'structure': scan_directory(root_path)
-    }
 
-    # Сохранение в файл
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        f.write('{"root": %s, "timestamp": %s, "structure": ' % (
+            json.dumps(str(root_path), ensure_ascii=False),
+            json.dumps(datetime.now().isoformat())
+        ))
+        _write_root(f, str(root_path))
+        f.write('}\n')
 
     print(f"Слепок сохранен в {output_file}")
-    return snapshot
+    return output_file
 
 if __name__ == "__main__":
     import argparse
@@ -1,4 +1,6 @@
 import git
+import os
+import subprocess
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -10,31 +12,43 @@ class GitManager:
     def __init__(self, repo_path: str):
         self.repo = git.Repo(repo_path)
         self.logger = logging.getLogger(__name__)
+        # (hexsha, время) последнего прочитанного HEAD
+        self._last_commit = None
 
     def get_changed_files(self, commit_range: str = "HEAD~1..HEAD") -> List[Dict]:
         """Получение измененных файлов между коммитами"""
-        diff = self.repo.git.diff(commit_range, name_status=True)
+        diff = subprocess.check_output(
+            ['git', '-C', self.repo.working_dir, 'diff', '-z', '--name-status', commit_range]
+        )
         return self._parse_diff(diff)
 
-    def _parse_diff(self, diff_output: str) -> List[Dict]:
-        """Парсинг вывода git diff"""
+    def _parse_diff(self, diff_output: bytes) -> List[Dict]:
+        """Парсинг вывода git diff -z: статус и пути разделены NUL,
+        поэтому пути с табуляцией и переводом строки разбираются корректно"""
+        working_dir = self.repo.working_dir
+        head_sha = self.repo.head.commit.hexsha
         changes = []
-        for line in diff_output.split('\n'):
-            if not line:
+        fields = iter(diff_output.split(b'\0'))
+        for status in fields:
+            if not status:
                 continue
-            status, path = line.split('\t', 1)
+            path = next(fields, b'')
+            # Для переименования и копирования (R100, C75) идут два пути: старый и новый
+            if status[:1] in (b'R', b'C'):
+                path = next(fields, b'')
             changes.append({
-                'status': status[0],
-                'path': str(Path(self.repo.working_dir) / path),
-                'commit_hash': self.repo.head.commit.hexsha
+                'status': status[:1].decode(),
+                'path': os.path.join(working_dir, os.fsdecode(path)),
+                'commit_hash': head_sha
             })
         return changes
 
     def auto_commit_metadata(self):
         """Автоматический коммит изменений метаданных"""
+        last_commit_time = self.last_commit_time()
         with get_session() as session:
             modified_files = session.query(FileMetadata).filter(
-                FileMetadata.last_analyzed > self.last_commit_time()
+                FileMetadata.last_analyzed > last_commit_time
             ).all()
 
             if modified_files:
@@ -42,8 +56,15 @@ class GitManager:
                 self.repo.index.commit(f"Auto-commit metadata at {datetime.now()}")
 
     def last_commit_time(self) -> datetime:
-        """Время последнего коммита"""
-        return self.repo.head.commit.committed_datetime
+        """Время последнего коммита
+
+        Объект коммита разбирается только при смене HEAD: hexsha берется
+        из ссылки без чтения самого объекта.
+        """
+        hexsha = self.repo.head.commit.hexsha
+        if self._last_commit is None or self._last_commit[0] != hexsha:
+            self._last_commit = (hexsha, self.repo.commit(hexsha).committed_datetime)
+        return self._last_commit[1]
 
 class ChangeTracker:
     def __init__(self, repo_path: str):
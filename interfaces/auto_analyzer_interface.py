@@ -13,6 +13,8 @@ import json
 import logging
 import threading
 import time
+import heapq
+from collections import Counter, OrderedDict
 from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
 
@@ -34,6 +36,11 @@ logger = logging.getLogger(__name__)
 class AutoAnalyzerInterface:
     """Интерфейс для автоматического анализатора кода"""
     
+    RESULTS_CACHE_SIZE = 1024  # Результатов в кэше, самые старые вытесняются
+    TASKS_COLLECTION = "analysis_tasks"  # Коллекция Qdrant с запросами завершенных задач
+    SIMILARITY_THRESHOLD = 0.6  # Минимальная косинусная близость похожей задачи
+    TASK_VECTORS_RETRY = 60.0  # Секунд до повторного подключения к Qdrant после ошибки
+    
     def __init__(self, merged_file_path: str = None):
         """
         Инициализация интерфейса для анализатора кода
@@ -59,40 +66,173 @@ class AutoAnalyzerInterface:
             self.analyzer = None
         
         # Кэш результатов для быстрого доступа
-        self.results_cache = {}
-        
-        # Запуск фоновой задачи для обновления кэша
-        self.running = True
-        self.update_thread = threading.Thread(target=self._update_cache_worker, daemon=True)
-        self.update_thread.start()
+        self.results_cache = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Слова запросов завершенных задач: task_id -> (слова, запрос, created_at);
+        # токенизация делается один раз при завершении, а не на каждый поиск
+        self._task_words = {}
+        
+        # Семантический поиск похожих задач через Qdrant; пока подключение не готово
+        # (или после ошибки, до повтора через TASK_VECTORS_RETRY) - None,
+        # тогда используется поиск по словам
+        self._task_vectors = None
+        self._task_vectors_lock = threading.Lock()
+        self._task_vectors_loading = False
+        self._task_vectors_retry_at = 0.0
+        self._task_vectors_backfilled = False
+        
+        # Счетчики статистики обновляются по событиям анализатора (под self._lock)
+        self._status_counts = Counter()
+        self._time_sum = 0.0
+        self._time_n = 0
+        self._iter_sum = 0
+        self._iter_n = 0
+        
+        # Задачи прошлых запусков учитываются один раз, дальше кэш, индекс и
+        # статистика обновляются по событиям, без периодического опроса
+        if self.analyzer:
+            self._load_existing_tasks()
+            self.analyzer.register_status_callback(self._on_status_change)
+            self.analyzer.register_completion_callback(self._on_completed)
     
     def stop(self):
         """Остановка интерфейса"""
         if self.analyzer:
             self.analyzer.stop()
+    
+    def _on_completed(self, task_id: str, task_info: Dict[str, Any]):
+        """Обработчик завершения задачи (вызывается в потоке анализатора)"""
+        if task_info["status"] != "completed":
+            return
+        
+        answer = (task_info.get("result") or {}).get("answer")
+        if answer is not None:
+            self._put(task_id, answer)
+        
+        with self._lock:
+            self._index_task(task_id, task_info)
+            self._add_completion_stats(task_info)
+        
+        task_vectors = self._get_task_vectors()
+        if task_vectors:
+            task_vectors.add_files([self._task_point(task_id, task_info)])
+    
+    def _get_task_vectors(self):
+        """Подключение к коллекции задач в Qdrant или None, пока оно не готово
+
+        Движок и модель создаются в фоновом потоке (на свежем кэше это
+        включает экспорт ONNX), поэтому вызывающий поток не ждет; после
+        ошибки подключение повторяется не раньше чем через TASK_VECTORS_RETRY.
+        """
+        with self._task_vectors_lock:
+            if (self._task_vectors is None and not self._task_vectors_loading
+                    and time.monotonic() >= self._task_vectors_retry_at):
+                self._task_vectors_loading = True
+                threading.Thread(
+                    target=self._connect_task_vectors, name="task-vectors-init", daemon=True
+                ).start()
+            return self._task_vectors
+    
+    def _connect_task_vectors(self):
+        task_vectors = None
+        try:
+            from core.storage.vector_db_py.qdrant_connector import VectorSearchEngine
+            
+            task_vectors = VectorSearchEngine(collection_name=self.TASKS_COLLECTION)
+            task_vectors.init_embedder()
+        except Exception as e:
+            logger.warning(
+                f"Семантический поиск задач недоступен, используется поиск по словам "
+                f"(повтор через {self.TASK_VECTORS_RETRY:.0f} с): {str(e)}"
+            )
+            task_vectors = None
+        with self._task_vectors_lock:
+            self._task_vectors = task_vectors
+            self._task_vectors_loading = False
+            if task_vectors is None:
+                self._task_vectors_retry_at = time.monotonic() + self.TASK_VECTORS_RETRY
+    
+    @staticmethod
+    def _task_point(task_id: str, task_info: Dict[str, Any]):
+        """Запись задачи для VectorSearchEngine.add_files: (id, текст, payload)"""
+        return (task_id, task_info["query"], {
+            "task_id": task_id,
+            "query": task_info["query"],
+            "created_at": task_info["created_at"]
+        })
+    
+    def _index_task(self, task_id: str, task_info: Dict[str, Any]):
+        """Добавление завершенной задачи в индекс поиска похожих (под self._lock)"""
+        self._task_words[task_id] = (
+            frozenset(task_info["query"].lower().split()),
+            task_info["query"],
+            task_info["created_at"]
+        )
+    
+    def _add_completion_stats(self, task_info: Dict[str, Any]):
+        """Учет времени обработки и числа итераций завершенной задачи (под self._lock)"""
+        if "created_at" in task_info and "updated_at" in task_info:
+            created = datetime.fromisoformat(task_info["created_at"])
+            updated = datetime.fromisoformat(task_info["updated_at"])
+            self._time_sum += (updated - created).total_seconds()
+            self._time_n += 1
+        
+        self._iter_sum += task_info["iterations"]
+        self._iter_n += 1
+    
+    def _on_status_change(self, task_id: str, old_status: Optional[str], new_status: str):
+        """Обработчик смены статуса задачи (вызывается в потоках анализатора)"""
+        with self._lock:
+            if old_status is not None:
+                self._status_counts[old_status] -= 1
+            self._status_counts[new_status] += 1
+    
+    def _load_existing_tasks(self):
+        """Однократный учет задач, сохраненных до запуска интерфейса"""
+        try:
+            all_tasks = self.analyzer.get_all_tasks()
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке сохраненных задач: {str(e)}")
+            return
         
-        self.running = False
-        if self.update_thread and self.update_thread.is_alive():
-            self.update_thread.join(timeout=5)
+        with self._lock:
+            for task_info in all_tasks:
+                self._status_counts[task_info["status"]] += 1
+                if task_info["status"] == "completed":
+                    self._index_task(task_info["task_id"], task_info)
+                    self._add_completion_stats(task_info)
     
-    def _update_cache_worker(self):
-        """Фоновая задача для обновления кэша результатов"""
-        while self.running:
-            try:
-                if self.analyzer:
-                    # Получение всех задач
-                    tasks = self.analyzer.get_all_tasks()
-                    
-                    # Обновление кэша
-                    for task_id, task_info in tasks.items():
-                        if task_info["status"] == "completed" and task_id not in self.results_cache:
-                            self.results_cache[task_id] = task_info["result"]["answer"]
-            
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении кэша: {str(e)}")
-            
-            # Ожидание перед следующим обновлением
-            time.sleep(5)
+    def _backfill_task_vectors(self, task_vectors):
+        """Однократная загрузка ранее завершенных задач в Qdrant"""
+        if self._task_vectors_backfilled:
+            return
+        
+        with self._lock:
+            indexed = list(self._task_words.items())
+        # ID точек детерминированы, поэтому повторная загрузка просто перезаписывает их
+        if indexed:
+            task_vectors.add_files([
+                self._task_point(task_id, {"query": task_query, "created_at": created_at})
+                for task_id, (_, task_query, created_at) in indexed
+            ])
+        self._task_vectors_backfilled = True
+    
+    def _get(self, task_id: str) -> Optional[str]:
+        """Чтение из LRU-кэша результатов"""
+        with self._lock:
+            result = self.results_cache.get(task_id)
+            if result is not None:
+                self.results_cache.move_to_end(task_id)
+            return result
+    
+    def _put(self, task_id: str, result: str):
+        """Запись в LRU-кэш результатов"""
+        with self._lock:
+            self.results_cache[task_id] = result
+            self.results_cache.move_to_end(task_id)
+            if len(self.results_cache) > self.RESULTS_CACHE_SIZE:
+                self.results_cache.popitem(last=False)
     
     def submit_analysis_task(self, query: str, priority: int = 5) -> Optional[str]:
         """
@@ -158,8 +298,9 @@ class AutoAnalyzerInterface:
             Результат анализа или None в случае ошибки
         """
         # Проверка кэша
-        if task_id in self.results_cache:
-            return self.results_cache[task_id]
+        cached = self._get(task_id)
+        if cached is not None:
+            return cached
         
         if not self.analyzer:
             logger.error("Анализатор не инициализирован")
@@ -182,7 +323,7 @@ class AutoAnalyzerInterface:
             result = task_info["result"]["answer"]
             
             # Обновление кэша
-            self.results_cache[task_id] = result
+            self._put(task_id, result)
             
             return result
         
@@ -326,35 +467,40 @@ class AutoAnalyzerInterface:
             return []
         
         try:
-            # Получение всех задач
-            all_tasks = self.analyzer.get_all_tasks()
+            # Семантический поиск (ANN в Qdrant) находит и перефразированные запросы
+            task_vectors = self._get_task_vectors()
+            if task_vectors:
+                self._backfill_task_vectors(task_vectors)
+                hits = task_vectors.search_payloads(query, limit, self.SIMILARITY_THRESHOLD)
+                return [{
+                    "task_id": payload["task_id"],
+                    "query": payload["query"],
+                    "similarity": score,
+                    "created_at": payload["created_at"]
+                } for payload, score in hits]
             
             # Поиск похожих задач (простой поиск по словам из запроса)
-            query_words = set(query.lower().split())
+            query_words = frozenset(query.lower().split())
+            query_len = max(1, len(query_words))
+            
+            with self._lock:
+                indexed = list(self._task_words.items())
+            
             similar_tasks = []
+            for task_id, (task_words, task_query, created_at) in indexed:
+                # Подсчет пересечения слов
+                similarity = len(query_words & task_words) / query_len
+                
+                if similarity > 0.3:  # Минимальный порог схожести
+                    similar_tasks.append({
+                        "task_id": task_id,
+                        "query": task_query,
+                        "similarity": similarity,
+                        "created_at": created_at
+                    })
             
-            for task_id, task_info in all_tasks.items():
-                if task_info["status"] == "completed":
-                    task_query = task_info["query"].lower()
-                    task_words = set(task_query.split())
-                    
-                    # Подсчет пересечения слов
-                    intersection = query_words.intersection(task_words)
-                    similarity = len(intersection) / max(1, len(query_words))
-                    
-                    if similarity > 0.3:  # Минимальный порог схожести
-                        similar_tasks.append({
-                            "task_id": task_id,
-                            "query": task_info["query"],
-                            "similarity": similarity,
-                            "created_at": task_info["created_at"]
-                        })
-            
-            # Сортировка по схожести
-            similar_tasks.sort(key=lambda x: -x["similarity"])
-            
-            # Ограничение количества результатов
-            return similar_tasks[:limit]
+            # Лучшие limit результатов без полной сортировки
+            return heapq.nlargest(limit, similar_tasks, key=lambda x: x["similarity"])
         
         except Exception as e:
             logger.error(f"Ошибка при поиске похожих задач: {str(e)}")
@@ -446,34 +592,19 @@ class AutoAnalyzerInterface:
             stats["status"] = "ready"
             stats["ready"] = True
             
-            # Получение всех задач
-            all_tasks = self.analyzer.get_all_tasks()
-            
-            # Подсчет задач по статусам
-            stats["tasks"]["total"] = len(all_tasks)
-            
-            processing_times = []
-            iterations_count = []
-            
-            for task_id, task_info in all_tasks.items():
-                status = task_info["status"]
-                stats["tasks"][status] = stats["tasks"].get(status, 0) + 1
+            # Счетчики поддерживаются обработчиками событий, здесь только чтение
+            with self._lock:
+                for status, count in self._status_counts.items():
+                    if count:
+                        stats["tasks"][status] = count
+                stats["tasks"]["total"] = sum(self._status_counts.values())
+                
+                # Расчет средних значений
+                if self._time_n:
+                    stats["performance"]["avg_processing_time"] = self._time_sum / self._time_n
                 
-                # Сбор данных для расчета среднего времени обработки и итераций
-                if status == "completed" and "created_at" in task_info and "updated_at" in task_info:
-                    created = datetime.fromisoformat(task_info["created_at"])
-                    updated = datetime.fromisoformat(task_info["updated_at"])
-                    processing_time = (updated - created).total_seconds()
-                    processing_times.append(processing_time)
-                    
-                    iterations_count.append(task_info["iterations"])
-            
-            # Расчет средних значений
-            if processing_times:
-                stats["performance"]["avg_processing_time"] = sum(processing_times) / len(processing_times)
-            
-            if iterations_count:
-                stats["performance"]["avg_iterations"] = sum(iterations_count) / len(iterations_count)
+                if self._iter_n:
+                    stats["performance"]["avg_iterations"] = self._iter_sum / self._iter_n
             
             return stats
         
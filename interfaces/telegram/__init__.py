@@ -3,6 +3,7 @@
 """
 
 from .bot import TelegramBot, create_bot
+from .bot_core import CodeAssistantBot
 from .handlers import register_handlers
 
-__all__ = ["TelegramBot", "create_bot", "register_handlers"]
+__all__ = ["TelegramBot", "create_bot", "CodeAssistantBot", "register_handlers"]
@@ -3,7 +3,6 @@
 """
 
 import logging
-import asyncio
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -26,6 +25,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# .env читается один раз при импорте, а не при каждом создании бота;
+# уже заданные переменные окружения load_dotenv не перезаписывает
+load_dotenv()
+
 
 class TelegramBot:
     """
@@ -39,9 +42,6 @@ class TelegramBot:
         Args:
             token: Токен доступа к Telegram API, по умолчанию берется из переменных окружения
         """
-        # Загрузка переменных окружения, если не загружены
-        load_dotenv()
-        
         # Получение токена из переменных окружения, если не передан явно
         self.token = token or os.getenv("TELEGRAM_BOT_TOKEN")
         
@@ -49,8 +49,17 @@ class TelegramBot:
             logger.error("TELEGRAM_BOT_TOKEN не найден в переменных окружения")
             raise ValueError("Токен бота не найден. Укажите его через аргумент или переменную окружения.")
         
-        # Инициализация приложения
-        self.application = Application.builder().token(self.token).build()
+        # Инициализация приложения; команды меню устанавливаются в post_init,
+        # внутри цикла событий polling
+        # Обновления обрабатываются параллельно, медленный обработчик не
+        # задерживает остальные
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(True)
+            .post_init(self._post_init)
+            .build()
+        )
         logger.info("Telegram bot initialized with token")
         
         # Флаг работы бота
@@ -64,6 +73,12 @@ class TelegramBot:
         await self.application.bot.set_my_commands(commands)
         logger.info("Bot commands set successfully")
     
+    async def _post_init(self, application: Application):
+        """
+        Вызывается PTB после инициализации приложения, до начала polling.
+        """
+        await self.set_commands()
+    
     def register_handlers(self):
         """
         Регистрирует обработчики команд бота.
@@ -79,12 +94,13 @@ class TelegramBot:
             logger.info("Starting bot")
             self.register_handlers()
             
-            # Устанавливаем команды бота
-            asyncio.run(self.set_commands())
-            
             # Запускаем бота
             self.is_running = True
-            self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+            self.application.run_polling(
+                poll_interval=0.0,
+                timeout=30,  # long polling: сервер держит запрос до прихода обновлений
+                allowed_updates=Update.ALL_TYPES
+            )
             
         except Exception as e:
             logger.error(f"Error running bot: {str(e)}")
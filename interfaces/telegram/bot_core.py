@@ -3,14 +3,17 @@
 Предоставляет интерфейс для взаимодействия с системой анализа кода через Telegram.
 """
 
+import atexit
 import logging
 import asyncio
-import csv
 import os
 import threading
 import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -30,7 +33,7 @@ from interfaces.telegram.handlers import register_additional_handlers
 logger = logging.getLogger(__name__)
 
 # Список ID администраторов (для команд с ограниченным доступом)
-ADMIN_IDS = [12345678]  # Замените на реальные ID администраторов
+ADMIN_IDS = frozenset((12345678,))  # Замените на реальные ID администраторов
 
 # Доступные команды бота
 BOT_COMMANDS = [
@@ -42,33 +45,171 @@ BOT_COMMANDS = [
     ("sql", "Выполнить SQL-запрос (только для админов)")
 ]
 
-def restricted(func):
-    """Декоратор для ограничения доступа к функциям бота"""
-    @wraps(func)
-    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = update.effective_user.id
-        if user_id not in ADMIN_IDS:
-            await update.message.reply_text("⛔ Доступ запрещен. Эта команда доступна только администраторам.")
+# Общий пул рабочих потоков для блокирующих вызовов CodeAssistant:
+# потоки переиспользуются, а число одновременных анализов ограничено
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ca-worker")
+
+# Команды бота и имена методов-обработчиков CodeAssistantBot
+_HANDLER_SPECS = (
+    ("start", "start"),
+    ("help", "help"),
+    ("search", "handle_search"),
+    ("analyze", "handle_analyze"),
+    ("status", "handle_status"),
+    ("terminal", "handle_terminal_command"),
+    ("sql", "handle_sql"),
+)
+
+# Префиксы специальных команд в обычных сообщениях (prefix:command);
+# разбор выполняют фильтры диспетчера, регистр и пробелы перед ":" не важны
+_TERMINAL_RE = re.compile(r"^\s*terminal\s*:", re.IGNORECASE)
+_QUERY_RE = re.compile(r"^\s*query\s*:", re.IGNORECASE)
+_SCRAPE_RE = re.compile(r"^\s*scrape\s*:", re.IGNORECASE)
+
+# Обратные кавычки в выводе закрыли бы блок ``` и Telegram отклонил бы
+# сообщение целиком; заменяются на похожий символ до отправки
+_MD_SANITIZE = str.maketrans({"`": "ʼ"})
+
+# Статические тексты ответов собираются один раз при импорте
+_WELCOME_TMPL = (
+    "👋 Привет, {name}! Я Code Assistant - интеллектуальный помощник для анализа кода.\n\n"
+    "Я могу помочь вам в анализе C# кода, поиске информации и ответах на вопросы.\n\n"
+    "Используйте команду /help для получения списка доступных команд."
+)
+
+_HELP_TEXT = (
+    "🔍 *Доступные команды:*\n\n"
+    "• /search [запрос] - Поиск кода по запросу\n"
+    "• /analyze - Запуск полного анализа проекта\n"
+    "• /status - Проверка статуса системы\n"
+    "• /help - Эта справка\n\n"
+    "*Специальные команды:*\n"
+    "• terminal:[команда] - Выполнение команды в терминале\n"
+    "• query:[SQL] - Выполнение SQL-запроса\n"
+    "• scrape:[url] [селектор] - Получение данных с веб-страницы\n\n"
+    "Вы также можете просто написать вопрос о коде, и я постараюсь на него ответить!"
+)
+
+# Проверка прав администратора: прямой вызов метода frozenset без
+# декоратора-обертки в стеке каждого вызова
+_is_admin = ADMIN_IDS.__contains__
+_ACCESS_DENIED = "⛔ Доступ запрещен. Эта команда доступна только администраторам."
+
+# Журнал действий пользователей пишется фоновым потоком пачками,
+# чтобы обработчики не ждали открытия файла и записи на диск
+USER_ACTIONS_LOG = os.path.join("logs", "user_actions.csv")
+LOG_BATCH_SIZE = 200  # строк за одну запись
+LOG_FLUSH_INTERVAL = 1.0  # секунд ожидания до записи неполной пачки
+LOG_STOP_TIMEOUT = 5.0  # секунд ожидания писателя при выходе
+
+_log_queue = queue.Queue()
+_LOG_STOP = object()  # сигнал писателю: записать пачку и завершиться
+_log_writer_thread = None
+_log_writer_lock = threading.Lock()
+_log_file_lock = threading.Lock()
+
+# Директория создается один раз при импорте
+os.makedirs(os.path.dirname(USER_ACTIONS_LOG), exist_ok=True)
+
+# Файл журнала открыт все время работы; строки пишутся одним буферизованным write
+_log_fp = None
+_CSV_HEADER = ("timestamp", "user_id", "username", "action")
+_CSV_SPECIAL = re.compile(r'[,"\r\n]')
+
+
+def _csv_field(value) -> str:
+    """Поле CSV; кавычки (как у csv.writer) только если они действительно нужны"""
+    value = "" if value is None else str(value)
+    if _CSV_SPECIAL.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_line(row) -> str:
+    return ",".join(map(_csv_field, row)) + "\r\n"
+
+
+def _write_log_rows(rows):
+    global _log_fp
+    with _log_file_lock:
+        if _log_fp is None:
+            _log_fp = open(USER_ACTIONS_LOG, "ab", buffering=1 << 16)
+            if _log_fp.tell() == 0:
+                rows = [_CSV_HEADER, *rows]
+        _log_fp.write("".join(map(_csv_line, rows)).encode("utf-8"))
+        _log_fp.flush()
+
+
+def _log_writer():
+    """Фоновая запись журнала пачками до LOG_BATCH_SIZE строк или LOG_FLUSH_INTERVAL;
+    получив _LOG_STOP, дописывает текущую пачку и завершается"""
+    while True:
+        rows = []
+        item = _log_queue.get()
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while item is not _LOG_STOP:
+            rows.append(item)
+            timeout = deadline - time.monotonic()
+            if len(rows) >= LOG_BATCH_SIZE or timeout <= 0:
+                break
+            try:
+                item = _log_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+        if rows:
+            try:
+                _write_log_rows(rows)
+            except Exception as e:
+                logger.error(f"User action log write error: {str(e)}")
+        if item is _LOG_STOP:
             return
-        return await func(self, update, context)
-    return wrapper
+
+
+def _stop_log_writer():
+    """При завершении процесса: писатель дописывает очередь и свою пачку по порядку"""
+    _log_queue.put(_LOG_STOP)
+    _log_writer_thread.join(LOG_STOP_TIMEOUT)
+
 
 def log_user_action(user_id: int, username: str, command: str):
     """Логирование действий пользователя для аналитики"""
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, "user_actions.csv")
+    global _log_writer_thread
+    if _log_writer_thread is None:
+        with _log_writer_lock:
+            if _log_writer_thread is None:
+                _log_writer_thread = threading.Thread(
+                    target=_log_writer, name="user-actions-log", daemon=True
+                )
+                _log_writer_thread.start()
+                atexit.register(_stop_log_writer)
+    _log_queue.put_nowait((datetime.now().isoformat(), user_id, username, command))
+
+def _split_text(text: str, limit: int):
+    """Разбиение текста на части не длиннее limit
     
-    file_exists = os.path.exists(log_file)
-    with open(log_file, "a", newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["timestamp", "user_id", "username", "action"])
-        writer.writerow([datetime.now().isoformat(), user_id, username, command])
+    Разрез делается по последнему переводу строки или пробелу в пределах
+    части, чтобы не рвать слова и разметку; без пробелов - ровно по limit.
+    """
+    start, end = 0, len(text)
+    while end - start > limit:
+        cut = text.rfind("\n", start, start + limit)
+        if cut <= start:
+            cut = text.rfind(" ", start, start + limit)
+        if cut <= start:
+            yield text[start:start + limit]
+            start += limit
+        else:
+            yield text[start:cut]
+            start = cut + 1  # разделитель не переносится в следующую часть
+    yield text[start:]
 
 class CodeAssistantBot:
     """Основной класс бота для работы с Code Assistant"""
     
+    SEARCH_CACHE_SIZE = 256
+    POLL_TIMEOUT = 30  # секунд ожидания в одном запросе getUpdates
+    STATUS_TTL = 2.0  # секунд, в течение которых /status отдает сохраненный статус
+    
     def __init__(self, token: str, code_assistant=None):
         """
         Инициализация бота.
@@ -79,48 +220,89 @@ class CodeAssistantBot:
         """
         self.token = token
         self.code_assistant = code_assistant
-        self.application = ApplicationBuilder().token(token).build()
+        # Обновления обрабатываются параллельно: пока один обработчик ждет
+        # рабочий поток, остальные продолжают отвечать
+        self.application = ApplicationBuilder().token(token).concurrent_updates(True).build()
         
         # Настройка и регистрация обработчиков команд
+        self._handlers_registered = False
         self._setup_handlers()
         
-        # Регистрация дополнительных обработчиков
-        register_additional_handlers(self.application, self.code_assistant)
-        
         # Кэш для хранения состояний пользователей
         self.user_states = {}
         
+        # Кэш результатов /search: одинаковые запросы в чате повторяются часто;
+        # сбрасывается после нового анализа проекта
+        self._search_cache = (
+            lru_cache(maxsize=self.SEARCH_CACHE_SIZE)(self.code_assistant.get_context)
+            if self.code_assistant else None
+        )
+        
+        # Последний статус системы и время его получения (time.monotonic)
+        self._status_cache = (0.0, None)
+        
         logger.info("Telegram bot initialized successfully")
     
     def _setup_handlers(self):
-        """Настройка основных обработчиков команд бота"""
-        self.application.add_handler(CommandHandler("start", self.start))
-        self.application.add_handler(CommandHandler("help", self.help))
-        self.application.add_handler(CommandHandler("search", self.handle_search))
-        self.application.add_handler(CommandHandler("analyze", self.handle_analyze))
-        self.application.add_handler(CommandHandler("status", self.handle_status))
-        self.application.add_handler(CommandHandler("terminal", self.handle_terminal_command))
-        self.application.add_handler(CommandHandler("sql", self.handle_sql))
+        """Настройка основных обработчиков команд бота
         
-        # Обработка обычных сообщений
+        Повторный вызов ничего не делает: диспетчер перебирает обработчики
+        линейно, и дубликаты замедлили бы разбор каждого обновления.
+        """
+        if self._handlers_registered:
+            return
+        self._handlers_registered = True
+        
+        for command, attr in _HANDLER_SPECS:
+            self.application.add_handler(CommandHandler(command, getattr(self, attr)))
+        
+        # Специальные команды в формате prefix:command. Регистрируются до
+        # общего обработчика: в группе срабатывает первый подошедший
+        text = filters.TEXT & ~filters.COMMAND
+        self.application.add_handler(MessageHandler(
+            text & filters.Regex(_TERMINAL_RE), self.handle_terminal_inline
+        ))
+        self.application.add_handler(MessageHandler(
+            text & filters.Regex(_QUERY_RE), self.handle_query_inline
+        ))
         self.application.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, 
-            self.handle_message
+            text & filters.Regex(_SCRAPE_RE), self.handle_scrape_inline
         ))
         
+        # Обработка обычных сообщений
+        self.application.add_handler(MessageHandler(text, self.handle_message))
+        
         # Обработка нажатий на кнопки
         self.application.add_handler(CallbackQueryHandler(self.handle_button))
+        
+        # Регистрация дополнительных обработчиков
+        register_additional_handlers(self.application)
+    
+    @staticmethod
+    def _join_args(args) -> str:
+        """Аргументы команды одной строкой (пустая строка, если их нет)"""
+        return " ".join(args) if args else ""
+    
+    @staticmethod
+    async def _reply_in_parts(message, text: str, template: str = "Часть {i}/{n}:\n{part}", **kwargs):
+        """Отправка длинного текста частями до 4000 символов.
+        
+        Части отправляются одновременно (один RTT вместо N), поэтому в чате
+        они могут прийти не по порядку - их порядок задает подпись "Часть i/n".
+        """
+        parts = list(_split_text(text, 4000))
+        n = len(parts)
+        await asyncio.gather(*(
+            message.reply_text(template.format(i=i, n=n, part=part), **kwargs)
+            for i, part in enumerate(parts, 1)
+        ))
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
         user = update.effective_user
         log_user_action(user.id, user.username, "/start")
         
-        welcome_text = (
-            f"👋 Привет, {user.first_name}! Я Code Assistant - интеллектуальный помощник для анализа кода.\n\n"
-            "Я могу помочь вам в анализе C# кода, поиске информации и ответах на вопросы.\n\n"
-            "Используйте команду /help для получения списка доступных команд."
-        )
+        welcome_text = _WELCOME_TMPL.format(name=user.first_name)
         
         # Создание клавиатуры с основными командами
         keyboard = create_main_menu()
@@ -135,58 +317,45 @@ class CodeAssistantBot:
         user = update.effective_user
         log_user_action(user.id, user.username, "/help")
         
-        help_text = (
-            "🔍 *Доступные команды:*\n\n"
-            "• /search [запрос] - Поиск кода по запросу\n"
-            "• /analyze - Запуск полного анализа проекта\n"
-            "• /status - Проверка статуса системы\n"
-            "• /help - Эта справка\n\n"
-            "*Специальные команды:*\n"
-            "• terminal:[команда] - Выполнение команды в терминале\n"
-            "• query:[SQL] - Выполнение SQL-запроса\n"
-            "• scrape:[url] [селектор] - Получение данных с веб-страницы\n\n"
-            "Вы также можете просто написать вопрос о коде, и я постараюсь на него ответить!"
-        )
-        
-        await update.message.reply_text(help_text, parse_mode="Markdown")
+        await update.message.reply_text(_HELP_TEXT, parse_mode="Markdown")
     
     async def handle_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /search для поиска кода"""
         user = update.effective_user
-        query = ' '.join(context.args) if context.args else ""
+        message = update.message
+        query = self._join_args(context.args)
         
         if not query:
-            await update.message.reply_text(
+            await message.reply_text(
                 "⚠️ Пожалуйста, укажите поисковый запрос.\n"
                 "Пример: /search методы класса User"
             )
             return
         
         log_user_action(user.id, user.username, f"/search {query}")
-        await update.message.reply_text(f"🔍 Ищу код по запросу: {query}...")
+        await message.reply_text(f"🔍 Ищу код по запросу: {query}...")
         
         try:
             if self.code_assistant:
-                # Выполнение поиска через CodeAssistant
-                context = self.code_assistant.get_context(query)
+                # Поиск (векторная БД) выполняется в рабочем потоке, цикл
+                # событий тем временем обслуживает другие обновления
+                context = await asyncio.get_running_loop().run_in_executor(
+                    _EXECUTOR, self._search_cache, query
+                )
                 
                 # Отправка результатов
                 if len(context) > 4000:
-                    parts = [context[i:i+4000] for i in range(0, len(context), 4000)]
-                    for i, part in enumerate(parts):
-                        await update.message.reply_text(
-                            f"Часть {i+1}/{len(parts)}:\n{part}"
-                        )
+                    await self._reply_in_parts(message, context)
                 else:
-                    await update.message.reply_text(context)
+                    await message.reply_text(context)
             else:
-                await update.message.reply_text(
+                await message.reply_text(
                     "⚠️ Поисковая система не инициализирована. Пожалуйста, сообщите администратору."
                 )
                 
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
-            await update.message.reply_text(
+            await message.reply_text(
                 f"❌ Произошла ошибка при поиске: {str(e)}"
             )
     
@@ -197,35 +366,28 @@ class CodeAssistantBot:
         
         await update.message.reply_text("🔍 Запускаю анализ проекта. Это может занять некоторое время...")
         
-        # Создание очереди для получения результата из отдельного потока
-        result_queue = queue.Queue()
-        
-        # Функция для выполнения анализа в отдельном потоке
-        def run_analysis():
-            try:
-                if self.code_assistant:
-                    result = self.code_assistant.analyze_project()
-                    result_queue.put(result)
-                else:
-                    result_queue.put({
-                        "status": "error",
-                        "message": "Система анализа не инициализирована"
-                    })
-            except Exception as e:
-                logger.error(f"Analysis error: {str(e)}")
-                result_queue.put({
+        # Анализ выполняется в рабочем потоке, цикл событий продолжает
+        # обрабатывать другие обновления
+        try:
+            if self.code_assistant:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    _EXECUTOR, self.code_assistant.analyze_project
+                )
+            else:
+                result = {
                     "status": "error",
-                    "message": f"Ошибка анализа: {str(e)}"
-                })
-        
-        # Запуск анализа в отдельном потоке
-        thread = threading.Thread(target=run_analysis)
-        thread.start()
-        thread.join()
+                    "message": "Система анализа не инициализирована"
+                }
+        except Exception as e:
+            logger.error(f"Analysis error: {str(e)}")
+            result = {
+                "status": "error",
+                "message": f"Ошибка анализа: {str(e)}"
+            }
         
-        # Получение и отправка результата
-        result = result_queue.get()
+        # Отправка результата
         if result["status"] == "success":
+            self._search_cache.cache_clear()  # индекс изменился
             await update.message.reply_text(
                 f"✅ {result['message']}\n\n"
                 f"📊 Статистика:\n"
@@ -242,7 +404,14 @@ class CodeAssistantBot:
         log_user_action(user.id, user.username, "/status")
         
         if self.code_assistant:
-            status = self.code_assistant.get_system_status()
+            # Повторные нажатия в пределах STATUS_TTL не обращаются к БД
+            now = time.monotonic()
+            ts, status = self._status_cache
+            if status is None or now - ts > self.STATUS_TTL:
+                status = await asyncio.get_running_loop().run_in_executor(
+                    _EXECUTOR, self.code_assistant.get_system_status
+                )
+                self._status_cache = (now, status)
             status_text = (
                 f"🖥 Статус системы:\n"
                 f"• Размер векторной БД: {status.get('vector_db_size', 'Н/Д')}\n"
@@ -256,140 +425,134 @@ class CodeAssistantBot:
             
         await update.message.reply_text(status_text)
     
-    @restricted
     async def handle_terminal_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /terminal для выполнения команд в терминале (только для админов)"""
         user = update.effective_user
-        command = ' '.join(context.args) if context.args else ""
+        message = update.message
+        if not _is_admin(user.id):
+            await message.reply_text(_ACCESS_DENIED)
+            return
+        command = self._join_args(context.args)
         
         if not command:
-            await update.message.reply_text(
+            await message.reply_text(
                 "⚠️ Пожалуйста, укажите команду для выполнения.\n"
                 "Пример: /terminal ls -la"
             )
             return
         
         log_user_action(user.id, user.username, f"/terminal {command}")
-        await update.message.reply_text(f"⚙️ Выполняю команду: {command}...")
+        await message.reply_text(f"⚙️ Выполняю команду: {command}...")
         
         try:
             if self.code_assistant:
-                result = self.code_assistant.terminal.run_command(command)
+                result = str(self.code_assistant.terminal.run_command(command)).translate(_MD_SANITIZE)
                 
                 # Отправка результата
                 if len(result) > 4000:
                     # Разбиение длинного результата на части
-                    parts = [result[i:i+4000] for i in range(0, len(result), 4000)]
-                    for i, part in enumerate(parts):
-                        await update.message.reply_text(
-                            f"Часть {i+1}/{len(parts)}:\n```\n{part}\n```",
-                            parse_mode="Markdown"
-                        )
+                    await self._reply_in_parts(
+                        message, result,
+                        "Часть {i}/{n}:\n```\n{part}\n```",
+                        parse_mode="Markdown"
+                    )
                 else:
-                    await update.message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
+                    await message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
             else:
-                await update.message.reply_text("⚠️ Терминальный сервис не инициализирован.")
+                await message.reply_text("⚠️ Терминальный сервис не инициализирован.")
                 
         except Exception as e:
             logger.error(f"Terminal command error: {str(e)}")
-            await update.message.reply_text(f"❌ Ошибка выполнения команды: {str(e)}")
+            await message.reply_text(f"❌ Ошибка выполнения команды: {str(e)}")
     
-    @restricted
     async def handle_sql(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /sql для выполнения SQL-запросов (только для админов)"""
         user = update.effective_user
-        query = ' '.join(context.args) if context.args else ""
+        message = update.message
+        if not _is_admin(user.id):
+            await message.reply_text(_ACCESS_DENIED)
+            return
+        query = self._join_args(context.args)
         
         if not query:
-            await update.message.reply_text(
+            await message.reply_text(
                 "⚠️ Пожалуйста, укажите SQL-запрос.\n"
                 "Пример: /sql SELECT * FROM classes LIMIT 5"
             )
             return
         
         log_user_action(user.id, user.username, f"/sql {query}")
-        await update.message.reply_text(f"🔍 Выполняю SQL-запрос: {query}...")
+        await message.reply_text(f"🔍 Выполняю SQL-запрос: {query}...")
         
         try:
             if self.code_assistant:
-                result = self.code_assistant.database.execute_query(query)
-                await update.message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
+                result = str(self.code_assistant.database.execute_query(query)).translate(_MD_SANITIZE)
+                await message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
             else:
-                await update.message.reply_text("⚠️ Сервис базы данных не инициализирован.")
+                await message.reply_text("⚠️ Сервис базы данных не инициализирован.")
                 
         except Exception as e:
             logger.error(f"SQL query error: {str(e)}")
-            await update.message.reply_text(f"❌ Ошибка выполнения запроса: {str(e)}")
+            await message.reply_text(f"❌ Ошибка выполнения запроса: {str(e)}")
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка обычных текстовых сообщений"""
         user = update.effective_user
-        message_text = update.message.text
+        message = update.message
+        message_text = message.text
         
         # Логирование входящего сообщения
         log_user_action(user.id, user.username, f"message: {message_text[:20]}...")
         
-        # Проверка на специальные команды в формате prefix:command
-        if ":" in message_text:
-            prefix, command = message_text.split(":", 1)
-            prefix = prefix.strip().lower()
-            
-            if prefix == "terminal":
-                # Имитация команды /terminal
-                context.args = command.split()
-                await self.handle_terminal_command(update, context)
-                return
-                
-            elif prefix == "query":
-                # Имитация команды /sql
-                context.args = command.split()
-                await self.handle_sql(update, context)
-                return
-                
-            elif prefix == "scrape":
-                await self.handle_scrape(update, message_text.split(":", 1)[1])
-                return
-        
         # Обычное сообщение - отправляем запрос в CodeAssistant
-        await update.message.reply_text("🤖 Обрабатываю ваш запрос...")
+        await message.reply_text("🤖 Обрабатываю ваш запрос...")
         
         try:
             if self.code_assistant:
-                # Создание очереди для получения результата из отдельного потока
-                response_queue = queue.Queue()
-                
-                # Функция для обработки сообщения в отдельном потоке
-                def process_message():
-                    try:
-                        result = self.code_assistant.handle_command(message_text)
-                        response_queue.put(result)
-                    except Exception as e:
-                        logger.error(f"Message processing error: {str(e)}")
-                        response_queue.put(f"⚠️ Ошибка обработки сообщения: {str(e)}")
-                
-                # Запуск обработки в отдельном потоке
-                thread = threading.Thread(target=process_message)
-                thread.start()
-                thread.join()
-                
-                # Получение и отправка ответа
-                response = response_queue.get()
+                # Обработка в рабочем потоке, не блокируя цикл событий
+                try:
+                    response = await asyncio.get_running_loop().run_in_executor(
+                        _EXECUTOR, self.code_assistant.handle_command, message_text
+                    )
+                except Exception as e:
+                    logger.error(f"Message processing error: {str(e)}")
+                    response = f"⚠️ Ошибка обработки сообщения: {str(e)}"
                 
                 # Разбиение длинного ответа на части
                 if len(response) > 4000:
-                    parts = [response[i:i+4000] for i in range(0, len(response), 4000)]
-                    for i, part in enumerate(parts):
-                        await update.message.reply_text(f"Часть {i+1}/{len(parts)}:\n{part}")
+                    await self._reply_in_parts(message, response)
                 else:
-                    await update.message.reply_text(response)
+                    await message.reply_text(response)
             else:
-                await update.message.reply_text(
+                await message.reply_text(
                     "⚠️ Система не инициализирована. Пожалуйста, сообщите администратору."
                 )
                 
         except Exception as e:
             logger.error(f"Message handling error: {str(e)}")
-            await update.message.reply_text(f"❌ Ошибка обработки сообщения: {str(e)}")
+            await message.reply_text(f"❌ Ошибка обработки сообщения: {str(e)}")
+    
+    @staticmethod
+    def _inline_command(update: Update) -> str:
+        """Логирует сообщение prefix:command и возвращает часть после префикса"""
+        user = update.effective_user
+        message_text = update.message.text
+        log_user_action(user.id, user.username, f"message: {message_text[:20]}...")
+        return message_text.split(":", 1)[1]
+    
+    async def handle_terminal_inline(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Сообщение terminal:команда - аналог /terminal"""
+        context.args = self._inline_command(update).split()
+        await self.handle_terminal_command(update, context)
+    
+    async def handle_query_inline(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Сообщение query:SQL - аналог /sql"""
+        context.args = self._inline_command(update).split()
+        await self.handle_sql(update, context)
+    
+    async def handle_scrape_inline(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Сообщение scrape:URL SELECTOR"""
+        await self.handle_scrape(update, self._inline_command(update))
     
     async def handle_scrape(self, update: Update, command: str):
         """Обработка команды для скрапинга веб-страницы"""
@@ -408,7 +571,7 @@ class CodeAssistantBot:
             await update.message.reply_text(f"🌐 Получаю данные с {url}...")
             
             if self.code_assistant:
-                result = self.code_assistant.scraper.scrape(url, selector)
+                result = str(self.code_assistant.scraper.scrape(url, selector)).translate(_MD_SANITIZE)
                 await update.message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
             else:
                 await update.message.reply_text("⚠️ Сервис скрапинга не инициализирован.")
@@ -447,4 +610,10 @@ class CodeAssistantBot:
     def run(self):
         """Запуск бота"""
         logger.info("Starting Telegram bot")
-        self.application.run_polling()
\ No newline at end of file
+        # Long polling: getUpdates ждет новые обновления на сервере до
+        # POLL_TIMEOUT секунд вместо частых пустых запросов
+        self.application.run_polling(
+            poll_interval=0.0,
+            timeout=self.POLL_TIMEOUT,
+            allowed_updates=Update.ALL_TYPES
+        )
\ No newline at end of file
@@ -4,10 +4,10 @@
 """
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional, Tuple
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BotCommand:
     """Класс представляющий команду Telegram-бота."""
     command: str
@@ -61,34 +61,41 @@ COMMANDS = [
 ]
 
 
-def get_commands_for_telegram() -> List[dict]:
+# Производные от COMMANDS данные строятся один раз при импорте
+_COMMAND_INDEX = {cmd.command: cmd for cmd in COMMANDS}
+
+_TG_COMMANDS = tuple(
+    (cmd.command.lstrip("/"), cmd.description)
+    for cmd in COMMANDS
+)
+
+_HELP_TEXT = (
+    "*🤖 Доступные команды:*\n\n"
+    + "".join(f"{cmd.command} - {cmd.description}\n" for cmd in COMMANDS)
+    + "\n_Используйте команду /help <команда> для получения детальной информации о конкретной команде._"
+)
+
+
+def get_commands_for_telegram() -> Tuple[Tuple[str, str], ...]:
     """
     Возвращает список команд в формате, понятном для регистрации в Telegram API.
     
+    Результат неизменяем, поэтому разделяется между всеми вызывающими.
+    
     Returns:
-        Список словарей с ключами 'command' и 'description'
+        Кортеж пар (команда, описание), принимаемый Bot.set_my_commands
     """
-    return [
-        {"command": cmd.command.lstrip("/"), "description": cmd.description}
-        for cmd in COMMANDS
-    ]
+    return _TG_COMMANDS
 
 
 def get_help_text() -> str:
     """
-    Формирует текст справки со списком всех команд.
+    Возвращает текст справки со списком всех команд.
     
     Returns:
         Строка с описанием всех команд в формате Markdown
     """
-    help_text = "*🤖 Доступные команды:*\n\n"
-    
-    for cmd in COMMANDS:
-        help_text += f"{cmd.command} - {cmd.description}\n"
-    
-    help_text += "\n_Используйте команду /help <команда> для получения детальной информации о конкретной команде._"
-    
-    return help_text
+    return _HELP_TEXT
 
 
 def get_command_help(command_name: str) -> Optional[str]:
@@ -105,8 +112,5 @@ def get_command_help(command_name: str) -> Optional[str]:
     if not command_name.startswith("/"):
         command_name = f"/{command_name}"
     
-    for cmd in COMMANDS:
-        if cmd.command == command_name:
-            return cmd.get_help()
-    
-    return None 
\ No newline at end of file
+    cmd = _COMMAND_INDEX.get(command_name)
+    return cmd.get_help() if cmd else None 
\ No newline at end of file
@@ -17,33 +17,59 @@ logger = logging.getLogger(__name__)
 # Состояния для ConversationHandler
 AWAITING_QUERY, PROCESSING = range(2)
 
+# Приветствие /start собирается один раз; подставляется только имя
+_WELCOME_TMPL = (
+    "👋 Привет, {name}!\n\n"
+    "Я бот для анализа кодовой базы. Могу помочь вам найти информацию о классах, "
+    "методах и примерах использования кода.\n\n"
+    "Используйте /help для списка доступных команд."
+)
+
+_UNKNOWN_COMMAND_TEXT = "Неизвестная команда. Используйте /help для списка доступных команд."
+
+# Клавиатура с основными командами для /start (неизменяема, строится один раз)
+_START_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📊 Статистика", callback_data="stats"),
+        InlineKeyboardButton("📋 Список классов", callback_data="classes")
+    ],
+    [
+        InlineKeyboardButton("❓ Помощь", callback_data="help")
+    ]
+])
+
+
+# Заглушка списка классов для /classes с ключами в нижнем регистре,
+# вычисленными один раз при загрузке
+_STUB_CLASSES = [
+    {**cls, "name_lc": cls["name"].lower(), "file_lc": cls["file"].lower()}
+    for cls in (
+        {"name": "FileManager", "file": "core/file_manager.py", "methods": 8},
+        {"name": "DatabaseHandler", "file": "core/db/handler.py", "methods": 12},
+        {"name": "ApiClient", "file": "core/api/client.py", "methods": 5},
+        {"name": "Logger", "file": "utils/logging.py", "methods": 3},
+        {"name": "ConfigParser", "file": "utils/config.py", "methods": 6}
+    )
+]
+
+
+def _args_tail(message_text: str) -> str:
+    """
+    Текст сообщения после команды: аргументы целиком, без повторной
+    склейки уже разобранного PTB списка context.args.
+    """
+    parts = message_text.split(None, 1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Обработчик команды /start.
     Отправляет приветственное сообщение и основную информацию о боте.
     """
-    user = update.effective_user
-    welcome_text = (
-        f"👋 Привет, {user.first_name}!\n\n"
-        "Я бот для анализа кодовой базы. Могу помочь вам найти информацию о классах, "
-        "методах и примерах использования кода.\n\n"
-        "Используйте /help для списка доступных команд."
-    )
-    
-    # Создаем клавиатуру с основными командами
-    keyboard = [
-        [
-            InlineKeyboardButton("📊 Статистика", callback_data="stats"),
-            InlineKeyboardButton("📋 Список классов", callback_data="classes")
-        ],
-        [
-            InlineKeyboardButton("❓ Помощь", callback_data="help")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    welcome_text = _WELCOME_TMPL.format(name=update.effective_user.first_name)
     
-    await update.message.reply_markdown(welcome_text, reply_markup=reply_markup)
+    await update.message.reply_markdown(welcome_text, reply_markup=_START_KEYBOARD)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -72,6 +98,11 @@ async def handle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     Обработчик команды /stats.
     Отправляет статистику по кодовой базе.
     """
+    await _render_stats(update.message)
+
+
+async def _render_stats(message) -> None:
+    """Отправляет статистику в ответ на message (команда или сообщение с кнопкой)."""
     try:
         # Заглушка для получения статистики
         # В реальной системе здесь будет запрос к базе данных
@@ -91,11 +122,11 @@ async def handle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             "_Данные обновлены: сегодня_"
         )
         
-        await update.message.reply_markdown(stats_text)
+        await message.reply_markdown(stats_text)
         
     except Exception as e:
         logger.error(f"Error in stats handler: {str(e)}")
-        await update.message.reply_text(
+        await message.reply_text(
             "😔 Не удалось получить статистику. Пожалуйста, попробуйте позже."
         )
 
@@ -111,8 +142,11 @@ async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         )
         return
     
-    file_path = " ".join(context.args)
-    
+    await _render_file(update.message, _args_tail(update.message.text))
+
+
+async def _render_file(message, file_path: str) -> None:
+    """Информация о файле: общая для /file и кнопки "Explain"."""
     try:
         # Заглушка для получения информации о файле
         # В реальной системе здесь будет анализ файла
@@ -125,23 +159,23 @@ async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             "total_lines": 120
         }
         
-        response = (
+        parts = [
             f"*📄 Информация о файле:* `{file_path}`\n\n"
             f"📏 Строк кода: {file_info['total_lines']}\n"
             f"🧩 Классов: {len(file_info['classes'])}\n\n"
             "*Найденные классы:*\n"
+        ]
+        parts.extend(
+            f"• `{cls['name']}` ({cls['methods']} методов)\n"
+            for cls in file_info["classes"]
         )
+        parts.append("\n_Используйте_ `/methods ИмяКласса` _для просмотра методов класса_")
         
-        for cls in file_info["classes"]:
-            response += f"• `{cls['name']}` ({cls['methods']} методов)\n"
-        
-        response += "\n_Используйте_ `/methods ИмяКласса` _для просмотра методов класса_"
-        
-        await update.message.reply_markdown(response)
+        await message.reply_markdown("".join(parts))
         
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
-        await update.message.reply_text(
+        await message.reply_text(
             f"😔 Не удалось обработать файл {file_path}. Убедитесь, что путь корректен."
         )
 
@@ -151,24 +185,24 @@ async def handle_classes(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     Обработчик команды /classes.
     Отправляет список классов, опционально отфильтрованный по запросу.
     """
-    search_query = " ".join(context.args) if context.args else None
-    
+    search_query = _args_tail(update.message.text) if context.args else None
+    await _render_classes(update.message, search_query)
+
+
+async def _render_classes(message, search_query: Optional[str]) -> None:
+    """Отправляет список классов в ответ на message (команда или сообщение с кнопкой)."""
     try:
         # Заглушка для получения классов
         # В реальной системе здесь будет запрос к базе данных
-        classes = [
-            {"name": "FileManager", "file": "core/file_manager.py", "methods": 8},
-            {"name": "DatabaseHandler", "file": "core/db/handler.py", "methods": 12},
-            {"name": "ApiClient", "file": "core/api/client.py", "methods": 5},
-            {"name": "Logger", "file": "utils/logging.py", "methods": 3},
-            {"name": "ConfigParser", "file": "utils/config.py", "methods": 6}
-        ]
+        classes = _STUB_CLASSES
         
-        # Фильтрация по запросу, если он есть
+        # Фильтрация по запросу, если он есть; запрос приводится к нижнему
+        # регистру один раз, ключи записей - заранее
         if search_query:
+            q = search_query.lower()
             filtered_classes = [
-                cls for cls in classes 
-                if search_query.lower() in cls["name"].lower() or search_query.lower() in cls["file"].lower()
+                cls for cls in classes
+                if q in cls["name_lc"] or q in cls["file_lc"]
             ]
             used_classes = filtered_classes
             has_filter = True
@@ -177,29 +211,28 @@ async def handle_classes(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             has_filter = False
         
         if not used_classes:
-            await update.message.reply_text(
+            await message.reply_text(
                 f"😔 Классы по запросу '{search_query}' не найдены."
             )
             return
         
-        response = (
-            f"*🧩 {'Найденные' if has_filter else 'Доступные'} классы:*\n\n"
+        parts = [f"*🧩 {'Найденные' if has_filter else 'Доступные'} классы:*\n\n"]
+        parts.extend(
+            f"{idx}. `{cls['name']}` - {cls['methods']} методов\n"
+            f"   📄 {cls['file']}\n\n"
+            for idx, cls in enumerate(used_classes[:10], 1)
         )
         
-        for idx, cls in enumerate(used_classes[:10], 1):
-            response += f"{idx}. `{cls['name']}` - {cls['methods']} методов\n"
-            response += f"   📄 {cls['file']}\n\n"
-        
         if len(used_classes) > 10:
-            response += f"_...и еще {len(used_classes) - 10} классов_\n\n"
+            parts.append(f"_...и еще {len(used_classes) - 10} классов_\n\n")
         
-        response += "_Используйте_ `/methods ИмяКласса` _для просмотра методов класса_"
+        parts.append("_Используйте_ `/methods ИмяКласса` _для просмотра методов класса_")
         
-        await update.message.reply_markdown(response)
+        await message.reply_markdown("".join(parts))
         
     except Exception as e:
         logger.error(f"Error in classes handler: {str(e)}")
-        await update.message.reply_text(
+        await message.reply_text(
             "😔 Не удалось получить список классов. Пожалуйста, попробуйте позже."
         )
 
@@ -215,7 +248,7 @@ async def handle_methods(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
     
-    class_name = " ".join(context.args)
+    class_name = _args_tail(update.message.text)
     
     try:
         # Заглушка для получения методов класса
@@ -242,16 +275,14 @@ async def handle_methods(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             )
             return
         
-        response = (
-            f"*⚙️ Методы класса `{class_name}`:*\n\n"
+        parts = [f"*⚙️ Методы класса `{class_name}`:*\n\n"]
+        parts.extend(
+            f"• `{method['name']}({method['params']})` → `{method['return_type']}`\n\n"
+            for method in methods
         )
+        parts.append("_Используйте_ `/sample ИмяКласса.ИмяМетода` _для поиска примеров использования_")
         
-        for method in methods:
-            response += f"• `{method['name']}({method['params']})` → `{method['return_type']}`\n\n"
-        
-        response += "_Используйте_ `/sample ИмяКласса.ИмяМетода` _для поиска примеров использования_"
-        
-        await update.message.reply_markdown(response)
+        await update.message.reply_markdown("".join(parts))
         
     except Exception as e:
         logger.error(f"Error getting methods for class {class_name}: {str(e)}")
@@ -271,7 +302,7 @@ async def handle_sample(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         return
     
-    query = " ".join(context.args)
+    query = _args_tail(update.message.text)
     
     try:
         # Заглушка для поиска примеров
@@ -308,19 +339,45 @@ async def handle_sample(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
 
 
-async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обработчик нажатий на инлайн-кнопки."""
+# Обработчики inline-кнопок: каждый регистрируется со своим pattern,
+# выбор обработчика по callback_data делает диспетчер PTB
+
+async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Кнопка "Помощь"."""
     query = update.callback_query
     await query.answer()
-    
-    if query.data == "help":
-        await query.message.reply_markdown(get_help_text())
-    elif query.data == "stats":
-        await handle_stats(update, context)
-    elif query.data == "classes":
-        # Создаем новый объект Update, так как нам нужно вызвать другой обработчик
-        custom_update = Update(update.update_id, message=query.message)
-        await handle_classes(custom_update, context)
+    await query.message.reply_markdown(get_help_text())
+
+
+async def stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Кнопка "Статистика"."""
+    query = update.callback_query
+    await query.answer()
+    await _render_stats(query.message)
+
+
+async def classes_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Кнопка "Список классов"."""
+    query = update.callback_query
+    await query.answer()
+    await _render_classes(query.message, None)
+
+
+async def explain_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Кнопка "Explain" (explain_<путь к файлу>)."""
+    query = update.callback_query
+    await query.answer()
+    await _render_file(query.message, query.data.partition("_")[2])
+
+
+async def answer_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Остальные кнопки: только снимаем индикатор загрузки у клиента."""
+    await update.callback_query.answer()
+
+
+async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Ответ на команду, для которой нет обработчика."""
+    await update.message.reply_text(_UNKNOWN_COMMAND_TEXT)
 
 
 def register_handlers(application) -> None:
@@ -337,13 +394,16 @@ def register_handlers(application) -> None:
     # Регистрация дополнительных обработчиков
     register_additional_handlers(application)
     
-    # Обработчик inline кнопок
-    application.add_handler(CallbackQueryHandler(callback_handler))
+    # Обработчики inline кнопок
+    application.add_handler(CallbackQueryHandler(help_callback, pattern=r"^help$"))
+    application.add_handler(CallbackQueryHandler(stats_callback, pattern=r"^stats$"))
+    application.add_handler(CallbackQueryHandler(classes_callback, pattern=r"^classes$"))
+    application.add_handler(CallbackQueryHandler(explain_callback, pattern=r"^explain_"))
+    # Последним: любой другой callback тоже должен получить answer()
+    application.add_handler(CallbackQueryHandler(answer_callback))
     
     # Обработчик для неизвестных команд
-    application.add_handler(MessageHandler(
-        filters.COMMAND, lambda u, c: u.message.reply_text("Неизвестная команда. Используйте /help для списка доступных команд.")
-    ))
+    application.add_handler(MessageHandler(filters.COMMAND, unknown_command))
 
 
 def register_additional_handlers(application) -> None:
@@ -2,27 +2,31 @@
 Модуль для создания клавиатур в Telegram-боте
 """
 
+from functools import lru_cache
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 
+# Статические клавиатуры неизменяемы (объекты PTB заморожены), поэтому
+# строятся один раз при импорте и переиспользуются во всех ответах
+_MAIN_MENU = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔍 Поиск", callback_data="search"),
+        InlineKeyboardButton("📊 Анализ", callback_data="analyze")
+    ],
+    [
+        InlineKeyboardButton("🖥 Статус", callback_data="status"),
+        InlineKeyboardButton("❓ Помощь", callback_data="help")
+    ]
+])
+
 def create_main_menu() -> InlineKeyboardMarkup:
     """
-    Создает основное меню с кнопками для быстрого доступа к функциям
+    Возвращает основное меню с кнопками для быстрого доступа к функциям
     
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками основных команд
     """
-    keyboard = [
-        [
-            InlineKeyboardButton("🔍 Поиск", callback_data="search"),
-            InlineKeyboardButton("📊 Анализ", callback_data="analyze")
-        ],
-        [
-            InlineKeyboardButton("🖥 Статус", callback_data="status"),
-            InlineKeyboardButton("❓ Помощь", callback_data="help")
-        ]
-    ]
-    
-    return InlineKeyboardMarkup(keyboard)
+    return _MAIN_MENU
 
 def create_confirmation_keyboard(action_id: str) -> InlineKeyboardMarkup:
     """
@@ -74,9 +78,10 @@ def create_pagination_keyboard(current_page: int, total_pages: int, prefix: str)
     
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=1024)
 def get_file_actions_keyboard(file_path: str):
     return InlineKeyboardMarkup([
         [InlineKeyboardButton("📝 Explain", callback_data=f"explain_{file_path}")],
         [InlineKeyboardButton("🔗 Dependencies", callback_data=f"deps_{file_path}")],
         [InlineKeyboardButton("📊 History", callback_data=f"history_{file_path}")]
-    ])
\ No newline at end of file
+    ])
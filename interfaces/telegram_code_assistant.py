@@ -588,10 +588,11 @@ class CodeAssistantBot:
         user_id = query.from_user.id
         self._update_user_activity(user_id)
         
-        # Обработка различных callback
-        if query.data.startswith('search_'):
+        # Обработка различных callback: данные вида "<действие>_<аргумент>"
+        action, _, arg = query.data.partition('_')
+        if action == 'search':
             # Поиск кода
-            search_query = query.data.replace('search_', '')
+            search_query = arg
             await query.answer(f"Поиск: {search_query}")
             
             # Подготовка контекста
@@ -600,9 +601,9 @@ class CodeAssistantBot:
             # Вызов команды поиска
             await self.cmd_search(update, context)
         
-        elif query.data.startswith('info_'):
+        elif action == 'info':
             # Информация об объекте
-            info_query = query.data.replace('info_', '')
+            info_query = arg
             await query.answer(f"Информация: {info_query}")
             
             # Подготовка контекста
@@ -271,10 +271,11 @@ class CodeAssistant:
         langs = set()
         
         for res in results:
-            langs.add(res['lang'])
+            lang = res['lang']
+            langs.add(lang)
             context.append(
                 f"🔍 **Code Fragment** (Score: {res['score']:.2f}, Lines {res.get('start_line', '?')}-{res.get('end_line', '?')})\n"
-                f"```{res['lang']}\n{textwrap.shorten(res['text'], width=200)}\n```\n"
+                f"```{lang}\n{textwrap.shorten(res['text'], width=200)}\n```\n"
                 f"📁 Source: {res.get('source', 'Unknown')}"
             )
             
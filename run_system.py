@@ -15,6 +15,11 @@ import time
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # uvloop не поддерживает Windows
+    uvloop = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -381,4 +386,6 @@ def main():
 
 
 if __name__ == "__main__":
+    if uvloop:
+        uvloop.install()
     main() 
\ No newline at end of file
@@ -17,4 +17,16 @@ def test_redis_cache():
 def test_file_cache_cleanup():
     cache = FileSystemCache()
     cache.set("expired", b"old", ttl=timedelta(seconds=-1))
-    assert cache.get("expired") is None
\ No newline at end of file
+    assert cache.get("expired") is None
+
+def test_layered_cache_mget():
+    cache = LayeredCache()
+    cache.add_backend(FileSystemCache())
+
+    cache.set("mget_a", b"a")
+    cache.set("mget_b", b"b")
+    assert cache.mget(["mget_a", "mget_b", "mget_missing"]) == {
+        "mget_a": b"a",
+        "mget_b": b"b",
+        "mget_missing": None
+    }
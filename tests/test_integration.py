@@ -1,3 +1,7 @@
+from core.integration.terminal_manager import TerminalManager
+from core.integration.web_search import WebSearchManager
+
+
 def test_web_search():
     search = WebSearchManager()
     results = search.google_search("Python memory management")
@@ -7,4 +11,10 @@ async def test_terminal_approval():
     term = TerminalManager()
     output, ok = await term.execute_command("rm -rf /", "user123")
     assert not ok
-    assert "approval" in output
\ No newline at end of file
+    assert "approval" in output
+
+def test_terminal_safe_command_prefix():
+    term = TerminalManager()
+    assert term._is_command_safe("ls -la")
+    assert not term._is_command_safe("rm -rf /tmp/ls")
+    assert not term._is_command_safe("lsblk")
@@ -1,6 +1,8 @@
+import csv
+import io
 import pytest
 from unittest.mock import Mock, AsyncMock
-from interfaces.telegram.bot_core import CodeAssistantBot
+from interfaces.telegram.bot_core import CodeAssistantBot, _csv_line, _split_text
 
 @pytest.fixture
 def mock_bot():
@@ -37,4 +39,44 @@ async def test_status_command(mock_bot):
     
     await mock_bot.handle_status(update, None)
     status_text = update.message.reply_text.call_args[0][0]
-    assert "Pending jobs: 5" in status_text
\ No newline at end of file
+    assert "Pending jobs: 5" in status_text
+
+def test_csv_line_matches_csv_writer():
+    rows = [
+        ("timestamp", "user_id", "username", "action"),
+        ("2024-01-01T00:00:00", 42, "alice", "/search users"),
+        ("2024-01-01T00:00:01", 7, None, "message: a, b..."),
+        ("2024-01-01T00:00:02", 0, 'quo"te', 'say "hi"'),
+        ("2024-01-01T00:00:03", -1, "", "line\nbreak\r\nand\rcr"),
+        ("2024-01-01T00:00:04", 3, "юзер", "  пробелы и 'апострофы'  "),
+    ]
+    expected = io.StringIO(newline="")
+    csv.writer(expected).writerows(rows)
+
+    assert "".join(map(_csv_line, rows)) == expected.getvalue()
+
+def test_split_text_cuts_on_line_or_word_boundaries():
+    # Короткие строки (разрез по \n) и одна длинная строка (разрез по пробелу)
+    text = "\n".join(
+        " ".join(f"word{i}_{j}" for j in range(i % 40 + 1)) for i in range(2000)
+    ) + "\n" + " ".join(f"long{j}" for j in range(3000))
+    parts = list(_split_text(text, 4000))
+
+    assert len(parts) > 1
+    assert all(len(part) <= 4000 for part in parts)
+    # Между частями выпадает ровно один разделитель: перевод строки или пробел
+    pos, separators = 0, set()
+    for part in parts[:-1]:
+        assert text[pos:pos + len(part)] == part
+        pos += len(part)
+        separators.add(text[pos])
+        pos += 1
+    assert text[pos:] == parts[-1]
+    assert separators == {"\n", " "}
+
+def test_split_text_without_whitespace_cuts_at_limit():
+    text = "x" * 9000
+    parts = list(_split_text(text, 4000))
+
+    assert [len(part) for part in parts] == [4000, 4000, 1000]
+    assert "".join(parts) == text
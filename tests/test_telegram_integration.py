@@ -14,7 +14,7 @@ class TestTelegramIntegration(unittest.TestCase):
         """Подготовка тестового окружения"""
         # Настройка моков для Telegram API
         self.mock_application = MagicMock()
-        mock_app_builder.return_value.token.return_value.build.return_value = self.mock_application
+        mock_app_builder.return_value.token.return_value.concurrent_updates.return_value.build.return_value = self.mock_application
         
         # Создание мока CodeAssistant
         self.mock_code_assistant = MagicMock()
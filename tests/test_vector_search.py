@@ -1,4 +1,8 @@
 import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from unittest.mock import Mock
 from core.storage.vector_db_py.qdrant_connector import VectorSearchEngine
 import numpy as np
@@ -37,4 +41,68 @@ def test_embedding_consistency(mock_embedder):
     
     vector = engine.embedder.encode(test_text)
     assert vector.shape == (384,)
-    assert np.allclose(vector, np.ones(384))
\ No newline at end of file
+    assert np.allclose(vector, np.ones(384))
+
+# Объединение параллельных search_files в один SearchBatch
+
+def _search_batch_response(request):
+    """Ответ SearchBatch: по одной точке на запрос, file_path - первая координата вектора"""
+    time.sleep(0.02)
+    return SimpleNamespace(result=[
+        SimpleNamespace(result=[SimpleNamespace(
+            payload={"file_path": SimpleNamespace(string_value=str(point.vector[0]))},
+            score=1.0
+        )])
+        for point in request.search_points
+    ])
+
+@pytest.fixture
+def coalescing_engine(monkeypatch, tmp_path):
+    monkeypatch.setattr(VectorSearchEngine, "_init_client", lambda self: None)
+    monkeypatch.setattr(VectorSearchEngine, "EMBED_CACHE_DIR", str(tmp_path))
+    engine = VectorSearchEngine()
+    engine.client = Mock()
+    engine.client.grpc_points.SearchBatch.side_effect = _search_batch_response
+    engine.embedder = Mock()
+    engine.encode_cached = lambda query: [float(query)]
+    return engine
+
+def _search_concurrently(engine, n):
+    barrier = threading.Barrier(n)
+
+    def search(i):
+        barrier.wait()
+        try:
+            return engine.search_files(str(i), top_k=1)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        return list(executor.map(search, range(n)))
+
+def test_search_alone_skips_coalesce_window(coalescing_engine):
+    coalescing_engine.SEARCH_COALESCE_WINDOW = 1.0
+
+    started = time.monotonic()
+    results = coalescing_engine.search_files("7", top_k=1)
+
+    assert time.monotonic() - started < 0.5
+    assert results[0]["file_path"] == "7.0"
+    assert coalescing_engine.client.grpc_points.SearchBatch.call_count == 1
+
+def test_concurrent_searches_share_batches(coalescing_engine):
+    coalescing_engine.SEARCH_COALESCE_WINDOW = 0.05
+    n = 20
+
+    results = _search_concurrently(coalescing_engine, n)
+
+    assert coalescing_engine.client.grpc_points.SearchBatch.call_count < n
+    assert [r[0]["file_path"] for r in results] == [str(float(i)) for i in range(n)]
+
+def test_search_batch_error_reaches_every_caller(coalescing_engine):
+    coalescing_engine.SEARCH_COALESCE_WINDOW = 0.05
+    coalescing_engine.client.grpc_points.SearchBatch.side_effect = RuntimeError("qdrant down")
+
+    results = _search_concurrently(coalescing_engine, 10)
+
+    assert all(isinstance(r, RuntimeError) for r in results)